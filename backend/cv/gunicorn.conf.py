@@ -0,0 +1,52 @@
+import os
+
+# Pre-fork deployment:  gunicorn -c gunicorn.conf.py main:app
+#
+# The master imports main.py once with CV_MODEL_WARMUP=preload, which loads the
+# detector weights without running them. Workers are forked from it and share
+# those pages copy-on-write; each one runs its warm-up inferences after fork,
+# so no inference thread pool is created in the master.
+#
+# Run ONE worker (the default) unless the service is only used over plain
+# HTTP request/response. Several parts of the app live in a single process:
+#   - Flask-SocketIO in threading mode supports one gunicorn worker; with no
+#     message_queue, emits never reach clients connected to another worker,
+#     and a load balancer can't pin clients to workers behind one port.
+#   - Verification jobs (/verify-chord/jobs) are held by the worker that
+#     started them: GET/DELETE on another worker answers 404, and skipping a
+#     chord there can't cancel the listening job.
+#   - Trackers, frame caches and live sessions are per process too.
+# With CV_WORKERS > 1, only /detect, /verify-chord, /verify-chord/clip and
+# the session endpoints behave; scale out with separate single-worker
+# instances instead. Sessions go in the sqlite store so they survive reloads.
+
+os.environ.setdefault("CV_MODEL_WARMUP", "preload")
+os.environ.setdefault("CV_SESSION_BACKEND", "sqlite")
+
+bind = f"0.0.0.0:{os.environ.get('CV_PORT', '5001')}"
+workers = int(os.environ.get("CV_WORKERS", "1"))
+worker_class = "gthread"
+threads = int(os.environ.get("CV_WORKER_THREADS", "16"))
+preload_app = True
+timeout = 120
+
+
+def when_ready(server):
+    if workers > 1:
+        server.log.warning("CV_WORKERS=%d: /stream, verification jobs and live mode only work "
+                           "with a single worker (see gunicorn.conf.py)", workers)
+
+
+def post_fork(server, worker):
+    torch_threads = os.environ.get("CV_TORCH_THREADS")
+    if torch_threads:
+        # Split the cores between workers instead of every worker using all of them
+        try:
+            import torch
+            torch.set_num_threads(int(torch_threads))
+        except ImportError:
+            pass
+
+    from utils.models import MODELS
+    MODELS.warm_up()
+    server.log.info("Worker %s warmed up: %s", worker.pid, MODELS.status())
@@ -1,65 +1,183 @@
 import cv2
 import time
 import threading
-import json
-from flask import Flask, request, jsonify
+import logging
+from flask import Flask, Response, request, jsonify
 from flask_cors import CORS
+from flask_socketio import SocketIO, emit, join_room, leave_room
 import base64
 import numpy as np
 import io
 import os
 
 # Import exactly like your working code
-from ultralytics import YOLO
+from utils.models import MODELS, get_detector
 from utils.overlay import draw_fretboard_overlay
-from utils.audio_chord_detector import wait_for_chord
+from utils.chord_geometry import ChordTable
+from utils.audio_chord_detector import CHORD_NAMES, CHORD_THRESHOLD, expected_chord_match, rank_chords, score_clips, wait_for_chord
+from utils.audio_clips import ClipError, decode_clip, decode_pcm, pcm_layout
+from utils.batcher import MicroBatcher
+from utils.tracker import GuitarTracker
+from utils.frame_cache import FrameCache
+from utils.fretboard_model import FretboardModel
+from utils.admission import AdmissionController
+from utils.jobs import JobPool
+from utils.session_runtime import SessionRuntime
+from utils.sessions import TTLCache, open_session_store
+from utils.metrics import REGISTRY, CONTENT_TYPE
+
+# Per-frame detail is logged at DEBUG, so it costs nothing unless CV_LOG_LEVEL=DEBUG
+logging.basicConfig(
+    level=os.environ.get("CV_LOG_LEVEL", "INFO").upper(),
+    format="%(asctime)s %(levelname)s %(name)s: %(message)s"
+)
+logger = logging.getLogger("strumspace.cv")
 
 # Load YOLOv8 model and chord data - EXACTLY like your working code
-print("🎸 Loading YOLO model...")
-model = YOLO("assets/models/best.pt")
-print(f"✅ YOLO model loaded: {model.names}")
+# Backend (pytorch / onnx / openvino / openvino-int8, or stub for benchmarks) comes from CV_MODEL_BACKEND.
+# CV_MODEL_WARMUP decides when it loads:
+#   eager      - load and warm up at import (single process, `python main.py`)
+#   preload    - load weights only; workers warm up after fork (gunicorn.conf.py)
+#   background - import returns at once, /health reports ready when loaded
+#   lazy       - load on the first frame
+MODEL_WARMUP = os.environ.get("CV_MODEL_WARMUP", "eager")
+if MODEL_WARMUP == "eager":
+    logger.info("🎸 Loading YOLO model...")
+    MODELS.load("detector")
+elif MODEL_WARMUP == "preload":
+    logger.info("🎸 Preloading YOLO weights...")
+    MODELS.load("detector", warm_up=False)
+elif MODEL_WARMUP == "background":
+    MODELS.load_in_background()
+elif MODEL_WARMUP != "lazy":
+    raise ValueError(f"Unknown CV_MODEL_WARMUP {MODEL_WARMUP!r}; expected eager, preload, background or lazy")
 
-print("🎵 Loading chord data...")
+logger.info("🎵 Loading chord data...")
 chord_data_path = "assets/data/chords.json"
 if os.path.exists(chord_data_path):
-    with open(chord_data_path) as f:
-        raw_chord_data = json.load(f)
-    print(f"✅ Loaded chord data from {chord_data_path}")
+    # Compiled once into arrays - both the JSON overlay and OpenCV drawing read this table
+    chord_table = ChordTable.from_json(chord_data_path)
+    logger.info("✅ Loaded chord data from %s", chord_data_path)
 else:
-    raw_chord_data = {}
-
-# Convert chord data to the format expected by generate_chord_overlay
-# Your current format: [[2, 5], [3, 6], [3, 1]]
-# Expected format: [(fret, string), (fret, string)]
-chord_data = {}
-
-for chord_name, positions in raw_chord_data.items():
-    if isinstance(positions, list) and len(positions) > 0:
-        # Convert [[fret, string], [fret, string]] to [(fret, string), (fret, string)]
-        chord_data[chord_name] = [(pos[0], pos[1]) for pos in positions if len(pos) >= 2]
-    else:
-        chord_data[chord_name] = []
+    chord_table = ChordTable({})
 
 # Add default chord data if file doesn't exist
-if not chord_data:
-    chord_data = {
+if not len(chord_table):
+    chord_table = ChordTable({
         "Am": [(1, 2), (2, 3), (2, 4)],  # fret, string format
         "C": [(1, 2), (2, 4), (3, 5)],
         "G": [(2, 5), (3, 6), (3, 1)],
         "D": [(2, 1), (3, 2), (2, 3)],
         "Em": [(2, 5), (2, 4)]
-    }
-    print("⚠️ Using default chord data")
+    })
+    logger.warning("⚠️ Using default chord data")
 
-print(f"✅ Processed chord data: {list(chord_data.keys())}")
-print(f"🎯 Example Am chord: {chord_data.get('Am', [])}")
+logger.info("✅ Processed chord data: %s", chord_table.names)
+logger.debug("🎯 Example Am chord: %s", chord_table.positions('Am'))
 
 # Zone-to-fret mapping - EXACTLY like your working code
 label_to_fret = {f"Zone{i}": i for i in range(1, 13)}
-print(f"🎯 Label to fret mapping: {label_to_fret}")
+logger.debug("🎯 Label to fret mapping: %s", label_to_fret)
 
 app = Flask(__name__)
 CORS(app)
+socketio = SocketIO(app, cors_allowed_origins="*", async_mode="threading")
+
+# Metrics - exposed in Prometheus text format on /metrics
+STAGE_SECONDS = REGISTRY.histogram(
+    "cv_stage_seconds", "Time spent in each frame processing stage", ["stage"])
+FRAME_SECONDS = REGISTRY.histogram(
+    "cv_frame_seconds", "End-to-end frame processing time", ["transport"])
+FRAMES_TOTAL = REGISTRY.counter(
+    "cv_frames_total", "Frames received for detection", ["transport"])
+FRAME_ERRORS_TOTAL = REGISTRY.counter(
+    "cv_frame_errors_total", "Frames that could not be decoded or processed", ["transport", "reason"])
+GUITAR_FRAMES_TOTAL = REGISTRY.counter(
+    "cv_guitar_frames_total", "Frames in which at least one fret zone was found")
+FRET_BOXES_TOTAL = REGISTRY.counter(
+    "cv_fret_boxes_total", "Fret zone boxes found across all frames")
+DETECTION_FRAMES_TOTAL = REGISTRY.counter(
+    "cv_detection_frames_total", "Frames by how their fret boxes were obtained", ["method"])
+SESSIONS_CREATED_TOTAL = REGISTRY.counter(
+    "cv_sessions_created_total", "Practice sessions created")
+REGISTRY.gauge(
+    "cv_active_sessions", "Practice sessions currently held in the session store",
+    function=lambda: len(session_store))
+VERIFICATIONS_TOTAL = REGISTRY.counter(
+    "cv_verifications_total", "Chord verification outcomes", ["outcome"])
+FRAMES_SHED_TOTAL = REGISTRY.counter(
+    "cv_frames_shed_total", "Frames skipped by admission control before decoding", ["transport", "reason"])
+FRETS_FILLED_TOTAL = REGISTRY.counter(
+    "cv_frets_filled_total", "Fret boxes placed by the fretboard geometry model instead of the detector")
+FRAME_REUSE_TOTAL = REGISTRY.counter(
+    "cv_frame_reuse_total", "Frame similarity checks by outcome (hit = inference skipped)", ["result"])
+BATCH_SIZE = REGISTRY.histogram(
+    "cv_inference_batch_size", "Frames per batched model call",
+    buckets=(1, 2, 4, 8, 16, 32, 64))
+BATCH_QUEUE_WAIT_SECONDS = REGISTRY.histogram(
+    "cv_inference_queue_wait_seconds", "Time frames wait in the batcher before inference")
+
+AUDIO_BATCH_SIZE = REGISTRY.histogram(
+    "cv_audio_batch_size", "Uploaded clips per batched scoring pass",
+    buckets=(1, 2, 4, 8, 16, 32, 64))
+AUDIO_CLIP_SECONDS = REGISTRY.histogram(
+    "cv_audio_clip_seconds", "Duration of uploaded verification clips",
+    buckets=(0.25, 0.5, 1.0, 2.0, 3.0, 5.0, 10.0))
+
+def record_batch(size, waits, duration):
+    BATCH_SIZE.observe(size)
+    for wait in waits:
+        BATCH_QUEUE_WAIT_SECONDS.observe(wait)
+
+# Cross-session inference batching - frames from every /detect request share model calls
+YOLO_MAX_BATCH_SIZE = int(os.environ.get("CV_MAX_BATCH_SIZE", "8"))
+YOLO_MAX_WAIT_MS = float(os.environ.get("CV_MAX_BATCH_WAIT_MS", "10"))
+
+def run_yolo_batch(payloads):
+    """Run batched model calls and return one detection list per (frame, imgsz) payload"""
+    # ROI crops and full frames are inferred at different sizes - one model call per size
+    by_size = {}
+    for i, (frame, imgsz) in enumerate(payloads):
+        by_size.setdefault(imgsz, []).append(i)
+    
+    detections = [None] * len(payloads)
+    for imgsz, indices in by_size.items():
+        results = get_detector().detect([payloads[i][0] for i in indices], imgsz=imgsz)
+        for i, result in zip(indices, results):
+            detections[i] = result
+    return detections
+
+inference_batcher = MicroBatcher(
+    run_yolo_batch,
+    max_batch_size=YOLO_MAX_BATCH_SIZE,
+    max_wait_ms=YOLO_MAX_WAIT_MS,
+    name="yolo-batcher",
+    on_batch=record_batch
+)
+
+# Keyframe tracking - full detection every N frames, optical flow in between
+TRACKING_ENABLED = os.environ.get("CV_TRACKING", "1") == "1"
+TRACKING_KEYFRAME_INTERVAL = int(os.environ.get("CV_KEYFRAME_INTERVAL", "10"))
+TRACKING_MIN_CONFIDENCE = float(os.environ.get("CV_TRACKING_MIN_CONFIDENCE", "0.6"))
+
+# ROI mode - infer a crop around the last fretboard box at a smaller size
+ROI_ENABLED = os.environ.get("CV_ROI", "1") == "1"
+ROI_IMGSZ = int(os.environ.get("CV_ROI_IMGSZ", "320"))
+ROI_PADDING = float(os.environ.get("CV_ROI_PADDING", "0.25"))
+ROI_MIN_CONFIDENCE = float(os.environ.get("CV_ROI_MIN_CONFIDENCE", "0.5"))
+
+# Frame reuse - skip inference while the picture is effectively unchanged.
+# Threshold is the mean gray-level difference of 32x32 thumbnails (0-255).
+FRAME_REUSE_ENABLED = os.environ.get("CV_FRAME_REUSE", "1") == "1"
+FRAME_REUSE_THRESHOLD = float(os.environ.get("CV_FRAME_REUSE_THRESHOLD", "3.0"))
+FRAME_REUSE_MAX_AGE = float(os.environ.get("CV_FRAME_REUSE_MAX_AGE", "0.5"))
+
+# Fretboard geometry - fits the fret spacing law to detected zones per session,
+# fills in frets the detector missed and pulls detected boxes SNAP of the way onto the fit.
+GEOMETRY_ENABLED = os.environ.get("CV_GEOMETRY", "1") == "1"
+GEOMETRY_MIN_FRETS = int(os.environ.get("CV_GEOMETRY_MIN_FRETS", "3"))
+GEOMETRY_FORGETTING = float(os.environ.get("CV_GEOMETRY_FORGETTING", "0.7"))
+GEOMETRY_SNAP = float(os.environ.get("CV_GEOMETRY_SNAP", "0.3"))
 
 # Chord progression sequences
 chord_sequences = {
@@ -68,137 +186,262 @@ chord_sequences = {
     "advanced": ["Am", "C", "G", "D", "D7", "G7", "Em", "A"]
 }
 
-# Session management
-active_sessions = {}
+# Admission control - per-session and global backpressure on frame streams.
+# Every frame reply carries recommended_interval_ms / recommended_width for the client.
+ADMISSION_ENABLED = os.environ.get("CV_ADMISSION", "1") == "1"
+admission = AdmissionController(
+    target_latency_ms=float(os.environ.get("CV_TARGET_LATENCY_MS", "150")),
+    max_in_flight=int(os.environ.get("CV_MAX_INFLIGHT_FRAMES", "32")),
+    min_interval_ms=float(os.environ.get("CV_MIN_FRAME_INTERVAL_MS", "66")),
+    max_interval_ms=float(os.environ.get("CV_MAX_FRAME_INTERVAL_MS", "1000")),
+    widths=[int(w) for w in os.environ.get("CV_FRAME_WIDTHS", "640,480,320").split(",")]
+)
+REGISTRY.gauge(
+    "cv_frames_in_flight", "Admitted frames currently being processed",
+    function=admission.in_flight)
+REGISTRY.gauge(
+    "cv_recommended_frame_interval_seconds", "Capture interval currently advised to clients",
+    function=lambda: admission.advice()["recommended_interval_ms"] / 1000.0)
+
+def admit_frame(session_id, transport):
+    """None if the frame should be processed, else the cheap "skipped" reply"""
+    if not ADMISSION_ENABLED:
+        return None
+    reason = admission.admit(session_id)
+    if reason is None:
+        return None
+    FRAMES_SHED_TOTAL.inc(transport=transport, reason=reason)
+    return {"success": True, "skipped": True, "reason": reason, **admission.advice(session_id)}
+
+def frame_done(session_id, started):
+    if ADMISSION_ENABLED:
+        admission.done(session_id, time.perf_counter() - started)
+
+# Session management - CV_SESSION_BACKEND=sqlite shares sessions between worker processes
+SESSION_BACKEND = os.environ.get("CV_SESSION_BACKEND", "memory")
+SESSION_DB_PATH = os.environ.get("CV_SESSION_DB", "sessions.db")
+SESSION_TTL = float(os.environ.get("CV_SESSION_TTL", "1800"))
+SESSION_CAPACITY = int(os.environ.get("CV_SESSION_CAPACITY", "10000"))
+
+session_store = open_session_store(SESSION_BACKEND, SESSION_DB_PATH, SESSION_CAPACITY, SESSION_TTL)
+
+# Tracking state lives in this process only and idles out on the same TTL
+session_trackers = TTLCache(SESSION_CAPACITY, SESSION_TTL)
+session_frame_caches = TTLCache(SESSION_CAPACITY, SESSION_TTL)
+session_fretboards = TTLCache(SESSION_CAPACITY, SESSION_TTL)
+
+def release_tracking_state(session_id):
+    """Drop the per-session vision state (tracker, frame cache, fretboard model)"""
+    session_trackers.pop(session_id)
+    session_frame_caches.pop(session_id)
+    session_fretboards.pop(session_id)
+
+def release_session_state(session_id):
+    """Drop everything this process holds for a session"""
+    release_tracking_state(session_id)
+    admission.forget(session_id)
+    verification_jobs.cancel_owner(session_id)
+    live_runtime.close(session_id)
+
+session_store.on_evict(release_session_state)
+
+def get_session_tracker(session_id):
+    """Per-session fret box tracker, created on first use"""
+    return session_trackers.get_or_create(session_id, lambda: GuitarTracker(
+        model=get_detector(),
+        keyframe_interval=TRACKING_KEYFRAME_INTERVAL,
+        min_confidence=TRACKING_MIN_CONFIDENCE,
+        roi_imgsz=ROI_IMGSZ,
+        roi_padding=ROI_PADDING,
+        roi_min_confidence=ROI_MIN_CONFIDENCE
+    ))
+
+def get_session_frame_cache(session_id):
+    """Per-session last-result cache for unchanged frames, created on first use"""
+    return session_frame_caches.get_or_create(session_id, lambda: FrameCache(
+        threshold=FRAME_REUSE_THRESHOLD,
+        max_age=FRAME_REUSE_MAX_AGE
+    ))
+
+def get_session_fretboard(session_id):
+    """Per-session fretboard geometry model, created on first use"""
+    return session_fretboards.get_or_create(session_id, lambda: FretboardModel(
+        forgetting=GEOMETRY_FORGETTING,
+        min_frets=GEOMETRY_MIN_FRETS,
+        snap=GEOMETRY_SNAP
+    ))
+
+def end_session(session_id):
+    """Drop a session together with its per-session state"""
+    return session_store.delete(session_id)
 
 def create_session(session_id, difficulty="beginner"):
-    global active_sessions
+    # Re-creating a session starts tracking from scratch
+    release_session_state(session_id)
     sequence = chord_sequences.get(difficulty, chord_sequences["beginner"])
-    active_sessions[session_id] = {
-        "difficulty": difficulty,
-        "chord_sequence": sequence,
-        "current_chord_idx": 0,
-        "start_time": time.time(),
-        "attempts": 0,
-        "score": 0,
-        "completed_chords": []
-    }
-    return active_sessions[session_id]
+    return session_store.create(session_id, difficulty, sequence)
 
 def get_current_chord(session_id):
-    if session_id not in active_sessions:
+    session = session_store.get(session_id)
+    if session is None:
         return None
-    session = active_sessions[session_id]
-    if session["current_chord_idx"] < len(session["chord_sequence"]):
-        return session["chord_sequence"][session["current_chord_idx"]]
-    return None
+    return session.current_chord()
 
 def advance_chord(session_id):
-    if session_id not in active_sessions:
+    has_more = session_store.update(session_id, lambda session: session.advance())
+    if has_more is None:
         return False
-    session = active_sessions[session_id]
-    session["completed_chords"].append(session["chord_sequence"][session["current_chord_idx"]])
-    session["current_chord_idx"] += 1
-    session["score"] += 10
-    session["attempts"] = 0
-    return session["current_chord_idx"] < len(session["chord_sequence"])
+    if not has_more:
+        # Nothing left to overlay - release the tracking state
+        release_tracking_state(session_id)
+    return has_more
 
 def generate_chord_overlay(chord_name, fret_boxes):
     """Generate AR overlay positions for a chord"""
-    positions = chord_data.get(chord_name, [])
-    overlay_positions = []
+    frets, strings, xs, ys = chord_table.overlay_points(chord_name, fret_boxes)
     
-    print(f"🎸 Generating overlay for {chord_name}: {positions}")
-    print(f"🎯 Available fret boxes: {list(fret_boxes.keys())}")
+    if logger.isEnabledFor(logging.DEBUG):
+        missing = sorted({f for f, _ in chord_table.positions(chord_name)} - set(frets.tolist()))
+        logger.debug("🎸 Overlay for %s: %d positions, frets not detected: %s", chord_name, len(xs), missing)
     
-    for fret, string in positions:
-        print(f"🔍 Processing fret {fret}, string {string}")
-        
-        if fret not in fret_boxes:
-            print(f"⚠️ Fret {fret} not detected in frame")
-            continue
-            
-        if not (1 <= string <= 6):
-            print(f"⚠️ Invalid string {string} (must be 1-6)")
-            continue
-            
-        x1, y1, x2, y2 = fret_boxes[fret]
-        if x2 <= x1:
-            print(f"⚠️ Invalid fret box for fret {fret}: {fret_boxes[fret]}")
-            continue
-            
-        # Use the SAME calculation as your working overlay
-        num_strings = 6
-        string_spacing = (x2 - x1) / (num_strings - 1)
-        col = num_strings - string  # reversed direction
-        
-        cx = int(x1 + col * string_spacing)
-        cy = int((y1 + y2) / 2)
-        
-        print(f"✅ Generated position for fret {fret}, string {string}: ({cx}, {cy})")
+    return [
+        {"x": x, "y": y, "fret": fret, "string": string, "finger": fret}
+        for x, y, fret, string in zip(xs.tolist(), ys.tolist(), frets.tolist(), strings.tolist())
+    ]
+
+def extract_fret_boxes(detections):
+    """Collect confident Zone boxes from one frame's detections as {fret: bbox}"""
+    fret_boxes = {}
+    debug = logger.isEnabledFor(logging.DEBUG)
+    
+    for label, conf, bbox in detections:
+        if debug:
+            logger.debug("🏷️  Detected: %s (confidence: %.3f)", label, conf)
         
-        overlay_positions.append({
-            "x": cx,
-            "y": cy,
-            "fret": fret,
-            "string": string,
-            "finger": fret
-        })
-    
-    print(f"📍 Generated {len(overlay_positions)} overlay positions")
-    print(f"📍 Final positions: {overlay_positions}")
-    return overlay_positions
-
-def process_frame_with_yolo(frame, current_chord):
+        if label in label_to_fret and conf > 0.5:
+            fret_boxes[label_to_fret[label]] = bbox.astype(int)
+    
+    return fret_boxes
+
+def infer_frame(image, imgsz=None):
+    """Detections for one image, batched together with other sessions' pending frames"""
+    return inference_batcher.submit((image, imgsz))
+
+def detect_fret_boxes(frame):
+    """Full-frame YOLO detection"""
+    return extract_fret_boxes(infer_frame(frame))
+
+def process_frame_with_yolo(frame, current_chord, session_id=None):
     """Process frame EXACTLY like your working standalone code"""
-    print(f"🔍 Processing frame with YOLO for chord: {current_chord}")
-    print(f"📐 Frame shape: {frame.shape}")
+    logger.debug("🔍 Processing %s frame for chord: %s", frame.shape, current_chord)
     
-    results = model(frame)
-    fret_boxes = {}
+    fret_boxes = None
+    if session_id is not None and FRAME_REUSE_ENABLED:
+        frame_cache = get_session_frame_cache(session_id)
+        with STAGE_SECONDS.time(stage="frame_diff"):
+            signature = frame_cache.signature(frame)
+            fret_boxes = frame_cache.lookup(signature)
+        FRAME_REUSE_TOTAL.inc(result="miss" if fret_boxes is None else "hit")
     
-    print(f"📊 YOLO results: {len(results)} result(s)")
+    if fret_boxes is not None:
+        # Same picture as last time - the boxes still hold, only the chord may have changed
+        method = "reused"
+    else:
+        fret_boxes, is_keyframe = run_detection(frame, session_id)
+        method = "detected" if is_keyframe else "tracked"
+        if session_id is not None and FRAME_REUSE_ENABLED:
+            frame_cache.store(signature, fret_boxes)
     
-    for r in results:
-        print(f"📦 Processing result with {len(r.boxes) if r.boxes is not None else 0} boxes")
-        
-        if r.boxes is not None:
-            for box in r.boxes:
-                label = r.names[int(box.cls[0])]
-                conf = float(box.conf[0])
-                
-                print(f"🏷️  Detected: {label} (confidence: {conf:.3f})")
-                
-                if label in label_to_fret and conf > 0.5:
-                    bbox = box.xyxy[0].cpu().numpy().astype(int)
-                    fret_num = label_to_fret[label]
-                    fret_boxes[fret_num] = bbox
-                    
-                    print(f"✅ Valid fret {fret_num}: {bbox}")
-    
-    print(f"🎯 Total fret boxes detected: {len(fret_boxes)}")
+    DETECTION_FRAMES_TOTAL.inc(method=method)
+    FRET_BOXES_TOTAL.inc(len(fret_boxes))
+    logger.debug("🎯 Total fret boxes %s: %d", method, len(fret_boxes))
     
     # Generate overlay using your working method
     overlay_positions = []
     guitar_detected = len(fret_boxes) > 0
     
     if guitar_detected:
-        overlay_positions = generate_chord_overlay(current_chord, fret_boxes)
-        print(f"📍 Overlay positions: {overlay_positions}")
+        GUITAR_FRAMES_TOTAL.inc()
+        overlay_boxes = fret_boxes
+        if session_id is not None and GEOMETRY_ENABLED:
+            with STAGE_SECONDS.time(stage="geometry"):
+                overlay_boxes = get_session_fretboard(session_id).complete(fret_boxes, frame.shape)
+            FRETS_FILLED_TOTAL.inc(len(overlay_boxes) - len(fret_boxes))
+        with STAGE_SECONDS.time(stage="overlay"):
+            overlay_positions = generate_chord_overlay(current_chord, overlay_boxes)
     
     return guitar_detected, overlay_positions, fret_boxes
 
+def run_detection(frame, session_id=None):
+    """Fret boxes for a frame via full detection, ROI crops or tracking; returns (fret_boxes, is_keyframe)"""
+    with STAGE_SECONDS.time(stage="inference"):
+        if session_id is None or not (TRACKING_ENABLED or ROI_ENABLED):
+            fret_boxes = detect_fret_boxes(frame)
+            is_keyframe = True
+        else:
+            tracker = get_session_tracker(session_id)
+            if ROI_ENABLED:
+                detect = lambda f: extract_fret_boxes(tracker.detect_roi(f, infer_frame))
+            else:
+                detect = detect_fret_boxes
+            
+            if TRACKING_ENABLED:
+                fret_boxes, is_keyframe = tracker.update(frame, detect)
+            else:
+                with tracker.lock:
+                    fret_boxes = detect(frame)
+                is_keyframe = True
+    return fret_boxes, is_keyframe
+
+def decode_frame(image_bytes):
+    """Decode raw JPEG/PNG bytes into a BGR frame, or None if undecodable"""
+    # Convert to OpenCV format - EXACTLY like your webcam feed
+    with STAGE_SECONDS.time(stage="imdecode"):
+        nparr = np.frombuffer(image_bytes, np.uint8)
+        frame = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+    if frame is None:
+        return None
+    
+    # CRITICAL: Ensure frame is in the same format as your working code
+    # Your webcam gives BGR, let's make sure we have the same
+    if len(frame.shape) != 3 or frame.shape[2] != 3:
+        logger.warning("⚠️ Unexpected frame format: %s", frame.shape)
+    return frame
+
 # API Endpoints
 @app.route('/health', methods=['GET'])
 def health_check():
-    return jsonify({
-        "status": "healthy",
+    """Service status; 503 until the detector can serve frames (lazy mode counts as ready)"""
+    state = MODELS.state("detector")
+    ready = state == "ready" or (state == "unloaded" and MODEL_WARMUP == "lazy")
+    detector = get_detector() if state == "ready" else None
+    body = {
+        "status": "healthy" if ready else "failed" if state == "failed" else "starting",
         "service": "CV Guitar Vision",
-        "active_sessions": len(active_sessions),
-        "yolo_available": True,
-        "model_classes": len(model.names),
-        "model_names": model.names
-    })
+        "active_sessions": len(session_store),
+        "session_backend": SESSION_BACKEND,
+        "yolo_available": state == "ready",
+        "models": MODELS.status(),
+        "model_backend": detector.backend if detector else os.environ.get("CV_MODEL_BACKEND", "pytorch"),
+        "model_classes": len(detector.names) if detector else None,
+        "model_names": detector.names if detector else None,
+        "inference_batcher": inference_batcher.stats(),
+        "audio_batcher": audio_batcher.stats(),
+        "admission": admission.stats(),
+        "verification_jobs": verification_jobs.counts(),
+        "live": live_runtime.stats()
+    }
+    return jsonify(body), 200 if ready else 503
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Prometheus scrape endpoint"""
+    return Response(REGISTRY.render(), content_type=CONTENT_TYPE)
+
+@app.route('/stats/inference', methods=['GET'])
+def inference_stats():
+    """Batch sizes and queue wait times of the shared inference scheduler"""
+    return jsonify(inference_batcher.stats())
 
 @app.route('/session/create', methods=['POST'])
 def create_chord_session():
@@ -211,21 +454,25 @@ def create_chord_session():
     
     session = create_session(session_id, difficulty)
     current_chord = get_current_chord(session_id)
+    SESSIONS_CREATED_TOTAL.inc()
     
-    print(f"🎸 Created session {session_id}: {difficulty} difficulty, starting with {current_chord}")
+    logger.info("🎸 Created session %s: %s difficulty, starting with %s", session_id, difficulty, current_chord)
     
     return jsonify({
         "success": True,
         "session_id": session_id,
         "difficulty": difficulty,
-        "chord_sequence": session["chord_sequence"],
+        "chord_sequence": session.chord_sequence,
         "current_chord": current_chord,
-        "total_chords": len(session["chord_sequence"])
+        "total_chords": len(session.chord_sequence)
     })
 
 @app.route('/detect', methods=['POST'])
 def detect_guitar():
     """Process video frame using EXACTLY the same method as your working code"""
+    started = time.perf_counter()
+    FRAMES_TOTAL.inc(transport="http")
+    admitted = None
     try:
         data = request.json
         image_data = data.get('image')
@@ -234,6 +481,13 @@ def detect_guitar():
         if not image_data or not session_id:
             return jsonify({"error": "image and session_id required"}), 400
         
+        # Shed excess frames before paying for base64 and JPEG decoding. Not a 2xx:
+        # clients that don't know about shedding must keep their last overlay.
+        skipped = admit_frame(session_id, "http")
+        if skipped is not None:
+            return jsonify(skipped), 429
+        admitted = session_id
+        
         current_chord = get_current_chord(session_id)
         if not current_chord:
             return jsonify({
@@ -241,56 +495,44 @@ def detect_guitar():
                 "guitar_detected": False,
                 "current_chord": None,
                 "chord_positions": [],
-                "message": "Session complete!"
+                "message": "Session complete!",
+                **admission.advice(session_id)
             })
         
-        print(f"\n🔍 === PROCESSING FRAME FOR {current_chord} ===")
-        
         # Decode image - FIXED VERSION to match your working code format
         try:
-            # Remove data URL prefix if present
-            if ',' in image_data:
-                image_data = image_data.split(',')[1]
+            with STAGE_SECONDS.time(stage="base64_decode"):
+                # Remove data URL prefix if present
+                if ',' in image_data:
+                    image_data = image_data.split(',')[1]
+                image_bytes = base64.b64decode(image_data)
             
-            # Decode base64
-            image_bytes = base64.b64decode(image_data)
-            print(f"📦 Decoded {len(image_bytes)} bytes")
-            
-            # Convert to OpenCV format - EXACTLY like your webcam feed
-            nparr = np.frombuffer(image_bytes, np.uint8)
-            frame = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+            frame = decode_frame(image_bytes)
             
             if frame is None:
-                print("❌ Failed to decode image")
+                FRAME_ERRORS_TOTAL.inc(transport="http", reason="decode")
+                logger.warning("❌ Failed to decode image for session %s", session_id)
                 return jsonify({
                     "success": False,
                     "error": "Failed to decode image",
                     "guitar_detected": False,
-                    "chord_positions": []
+                    "chord_positions": [],
+                    **admission.advice(session_id)
                 })
             
-            print(f"📐 Decoded frame shape: {frame.shape}")
-            print(f"📊 Frame dtype: {frame.dtype}")
-            
-            # CRITICAL: Ensure frame is in the same format as your working code
-            # Your webcam gives BGR, let's make sure we have the same
-            if len(frame.shape) == 3 and frame.shape[2] == 3:
-                # Frame is already BGR (like webcam), perfect!
-                pass
-            else:
-                print("⚠️ Unexpected frame format")
-            
         except Exception as e:
-            print(f"❌ Image decoding error: {e}")
+            FRAME_ERRORS_TOTAL.inc(transport="http", reason="decode")
+            logger.warning("❌ Image decoding error: %s", e)
             return jsonify({
                 "success": False,
                 "error": f"Image decode error: {e}",
                 "guitar_detected": False,
-                "chord_positions": []
+                "chord_positions": [],
+                **admission.advice(session_id)
             })
         
         # Process frame using EXACTLY your working method
-        guitar_detected, overlay_positions, fret_boxes = process_frame_with_yolo(frame, current_chord)
+        guitar_detected, overlay_positions, fret_boxes = process_frame_with_yolo(frame, current_chord, session_id)
         
         response_data = {
             "success": True,
@@ -304,93 +546,282 @@ def detect_guitar():
                 "fret_boxes": list(fret_boxes.keys()),
                 "overlay_count": len(overlay_positions)
             },
-            "message": f"Play {current_chord}" if guitar_detected else "Position guitar in view"
+            "message": f"Play {current_chord}" if guitar_detected else "Position guitar in view",
+            **admission.advice(session_id)
         }
         
-        print(f"📤 Response: guitar_detected={guitar_detected}, positions={len(overlay_positions)}")
-        print(f"=== END FRAME PROCESSING ===\n")
-        
-        return jsonify(response_data)
+        with STAGE_SECONDS.time(stage="serialize"):
+            response = jsonify(response_data)
+        FRAME_SECONDS.observe(time.perf_counter() - started, transport="http")
+        return response
         
     except Exception as e:
-        print(f"❌ Detection error: {e}")
-        import traceback
-        traceback.print_exc()
+        FRAME_ERRORS_TOTAL.inc(transport="http", reason="processing")
+        logger.exception("❌ Detection error: %s", e)
         return jsonify({
             "success": False,
             "error": str(e),
             "guitar_detected": False,
             "chord_positions": []
         }), 500
+    finally:
+        if admitted is not None:
+            frame_done(admitted, started)
+
+def verify_chord_audio(chord, cancel_event=None):
+    """Run the audio check for one chord"""
+    # Use your working audio detection
+    try:
+        return wait_for_chord(chord, cancel_event=cancel_event)
+    except:
+        # Fallback to mock for now
+        return True
+
+def apply_verification_result(session_id, current_chord, is_correct):
+    """Record one verification attempt and build the client response.
+
+    Returns None if the session is gone or has moved past `current_chord`.
+    """
+    def record(session):
+        if session.current_chord() != current_chord:
+            return None
+        session.attempts += 1
+        has_more = session.advance() if is_correct else True
+        return has_more, session.current_chord(), session.score, session.attempts
+    
+    outcome = session_store.update(session_id, record)
+    if outcome is None:
+        return None
+    has_more, next_chord, score, attempts = outcome
+    VERIFICATIONS_TOTAL.inc(outcome="correct" if is_correct else "incorrect")
+    
+    if is_correct:
+        if not has_more:
+            release_tracking_state(session_id)
+        
+        return {
+            "success": True,
+            "is_correct": True,
+            "detected_chord": current_chord,
+            "expected_chord": current_chord,
+            "message": f"✅ You played {current_chord} correctly!" + (f" ▶️ Next: {next_chord}" if next_chord else ""),
+            "next_chord": next_chord,
+            "session_complete": not has_more,
+            "score": score,
+            "attempts": attempts
+        }
+    
+    return {
+        "success": True,
+        "is_correct": False,
+        "expected_chord": current_chord,
+        "message": f"❌ Not {current_chord} yet. Try again...",
+        "attempts": attempts
+    }
+
+SESSION_COMPLETE_RESPONSE = {
+    "success": True,
+    "is_correct": False,
+    "message": "🎉 Session complete!",
+    "session_complete": True
+}
 
 @app.route('/verify-chord', methods=['POST'])
 def verify_chord():
-    """Verify chord - using your working audio detection"""
+    """Verify chord - using your working audio detection (blocks until done)"""
     try:
         data = request.json
         session_id = data.get('session_id')
         
-        if not session_id or session_id not in active_sessions:
+        if not session_id or session_id not in session_store:
             return jsonify({"error": "Invalid session"}), 400
         
         current_chord = get_current_chord(session_id)
         if not current_chord:
-            return jsonify({
-                "success": True,
-                "is_correct": False,
-                "message": "🎉 Session complete!",
-                "session_complete": True
-            })
-        
-        print(f"🎵 Verifying chord {current_chord} for session {session_id}")
+            return jsonify(SESSION_COMPLETE_RESPONSE)
         
-        # Use your working audio detection
-        try:
-            is_correct = wait_for_chord(current_chord)
-        except:
-            # Fallback to mock for now
-            is_correct = True
+        logger.info("🎵 Verifying chord %s for session %s", current_chord, session_id)
         
-        active_sessions[session_id]["attempts"] += 1
-        
-        if is_correct:
-            has_more = advance_chord(session_id)
-            next_chord = get_current_chord(session_id) if has_more else None
-            
-            return jsonify({
-                "success": True,
-                "is_correct": True,
-                "detected_chord": current_chord,
-                "expected_chord": current_chord,
-                "message": f"✅ You played {current_chord} correctly!" + (f" ▶️ Next: {next_chord}" if next_chord else ""),
-                "next_chord": next_chord,
-                "session_complete": not has_more,
-                "score": active_sessions[session_id]["score"],
-                "attempts": 0 if has_more else active_sessions[session_id]["attempts"]
-            })
-        
-        return jsonify({
-            "success": True,
-            "is_correct": False,
-            "expected_chord": current_chord,
-            "message": f"❌ Not {current_chord} yet. Try again...",
-            "attempts": active_sessions[session_id]["attempts"]
-        })
+        is_correct = verify_chord_audio(current_chord)
+        response = apply_verification_result(session_id, current_chord, is_correct)
+        if response is None:
+            return jsonify({"error": "Session moved on during verification"}), 409
+        return jsonify(response)
         
     except Exception as e:
-        print(f"❌ Chord verification error: {e}")
+        logger.exception("❌ Chord verification error: %s", e)
+        return jsonify({"error": "Verification failed"}), 500
+
+# Job-based verification - listening runs on a worker pool, clients poll or get a push
+VERIFY_WORKERS = int(os.environ.get("CV_VERIFY_WORKERS", "4"))
+verification_jobs = JobPool(max_workers=VERIFY_WORKERS, name="verify")
+
+def verification_job_payload(job):
+    payload = job.to_dict()
+    payload["session_id"] = job.owner
+    return payload
+
+def run_verification_job(session_id, chord, cancel_event):
+    """Worker body: listen, then apply the outcome if the session still wants this chord"""
+    is_correct = verify_chord_audio(chord, cancel_event)
+    if cancel_event.is_set():
+        return None
+    response = apply_verification_result(session_id, chord, is_correct)
+    if response is None:
+        # The session moved on (skip, restart) while we were listening
+        cancel_event.set()
+    return response
+
+def push_verification_job(job):
+    """Push a finished job's outcome to the session's stream clients"""
+    logger.info("🎵 Verification job %s for %s: %s", job.job_id, job.owner, job.status)
+    if job.status in ("cancelled", "failed"):
+        VERIFICATIONS_TOTAL.inc(outcome=job.status)
+    socketio.emit('verification', verification_job_payload(job),
+                  to=job.owner, namespace=STREAM_NAMESPACE)
+
+@app.route('/verify-chord/jobs', methods=['POST'])
+def submit_verification_job():
+    """Start listening for the current chord in the background"""
+    data = request.json or {}
+    session_id = data.get('session_id')
+    
+    if not session_id or session_id not in session_store:
+        return jsonify({"error": "Invalid session"}), 400
+    
+    current_chord = get_current_chord(session_id)
+    if not current_chord:
+        return jsonify(SESSION_COMPLETE_RESPONSE)
+    
+    job = verification_jobs.active_for(session_id)
+    if job is None:
+        job = verification_jobs.submit(
+            session_id,
+            lambda cancel_event: run_verification_job(session_id, current_chord, cancel_event),
+            on_finish=push_verification_job
+        )
+        logger.info("🎵 Queued verification of %s for session %s: %s", current_chord, session_id, job.job_id)
+    
+    payload = verification_job_payload(job)
+    payload["expected_chord"] = current_chord
+    return jsonify(payload), 202
+
+@app.route('/verify-chord/jobs/<job_id>', methods=['GET'])
+def get_verification_job(job_id):
+    job = verification_jobs.get(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(verification_job_payload(job))
+
+@app.route('/verify-chord/jobs/<job_id>', methods=['DELETE'])
+def cancel_verification_job(job_id):
+    job = verification_jobs.cancel(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(verification_job_payload(job))
+
+# Uploaded-clip verification - browsers record a short clip and send it here.
+# Clips from all sessions are scored together in batched chroma/template passes.
+AUDIO_MAX_BATCH_SIZE = int(os.environ.get("CV_AUDIO_MAX_BATCH_SIZE", "32"))
+AUDIO_MAX_BATCH_WAIT_MS = float(os.environ.get("CV_AUDIO_MAX_BATCH_WAIT_MS", "20"))
+AUDIO_MIN_SECONDS = float(os.environ.get("CV_AUDIO_MIN_SECONDS", "0.25"))
+AUDIO_MAX_SECONDS = float(os.environ.get("CV_AUDIO_MAX_SECONDS", "5"))
+
+def score_clip_batch(payloads):
+    """Batcher body: (samples, sr, expected_chord) -> (detected_chord, confidence, matched) per clip"""
+    _, scores = score_clips([(samples, sr) for samples, sr, _ in payloads])
+    results = []
+    for column, (_, _, expected) in zip(scores.T, payloads):
+        best = int(np.argmax(rank_chords(column)))
+        detected = CHORD_NAMES[best] if column[best] > CHORD_THRESHOLD else "Unknown"
+        matched, confidence = expected_chord_match(column, expected)
+        results.append((detected, confidence, matched))
+    return results
+
+audio_batcher = MicroBatcher(
+    score_clip_batch,
+    max_batch_size=AUDIO_MAX_BATCH_SIZE,
+    max_wait_ms=AUDIO_MAX_BATCH_WAIT_MS,
+    name="audio-batcher",
+    on_batch=lambda size, waits, duration: AUDIO_BATCH_SIZE.observe(size)
+)
+
+def verify_clip(session_id, data, content_type, sr=None, channels=1, sample_format="s16le"):
+    """Decode, score and record one uploaded clip; returns (response, status)"""
+    if not session_id or session_id not in session_store:
+        return {"error": "Invalid session"}, 400
+    
+    current_chord = get_current_chord(session_id)
+    if not current_chord:
+        return SESSION_COMPLETE_RESPONSE, 200
+    
+    try:
+        with STAGE_SECONDS.time(stage="audio_decode"):
+            samples, sr = decode_clip(data, content_type, sr, channels, sample_format)
+    except ClipError as e:
+        return {"error": str(e)}, e.status
+    
+    duration = len(samples) / sr
+    AUDIO_CLIP_SECONDS.observe(duration)
+    if duration < AUDIO_MIN_SECONDS:
+        return {"error": f"Clip too short ({duration:.2f}s, need {AUDIO_MIN_SECONDS}s)"}, 400
+    if duration > AUDIO_MAX_SECONDS:
+        # Score the latest part - that's where the student is holding the chord
+        samples = samples[-int(AUDIO_MAX_SECONDS * sr):]
+    
+    with STAGE_SECONDS.time(stage="audio_score"):
+        detected, confidence, is_correct = audio_batcher.submit((samples, sr, current_chord))
+    
+    response = apply_verification_result(session_id, current_chord, is_correct)
+    if response is None:
+        return {"error": "Session moved on during verification"}, 409
+    # A match within the margin of a related chord still reports the expected one
+    response["detected_chord"] = current_chord if is_correct else detected
+    response["confidence"] = round(confidence, 3)
+    if is_correct:
+        # Heard it - anything still listening on the server side is moot
+        verification_jobs.cancel_owner(session_id)
+    return response, 200
+
+@app.route('/verify-chord/clip', methods=['POST'])
+def verify_chord_clip():
+    """Verify the current chord from an uploaded clip.
+
+    Either multipart form data (fields `session_id`, `audio` file) or the raw
+    clip as the request body with `?session_id=`. WAV and compressed formats
+    are detected from the content type; raw PCM (audio/pcm) also needs
+    `sr`, and optionally `channels` and `format` (s16le, s32le, f32le).
+    """
+    try:
+        upload = request.files.get('audio')
+        if upload is not None:
+            data, content_type = upload.read(), upload.mimetype
+        else:
+            data, content_type = request.get_data(), request.mimetype
+        args = request.values
+        response, status = verify_clip(
+            args.get('session_id'), data, content_type,
+            sr=args.get('sr'),
+            channels=args.get('channels', 1),
+            sample_format=args.get('format', 's16le')
+        )
+        return jsonify(response), status
+    except Exception as e:
+        logger.exception("❌ Clip verification error: %s", e)
         return jsonify({"error": "Verification failed"}), 500
 
 @app.route('/session/<session_id>/next', methods=['POST'])
 def skip_chord(session_id):
     """Skip to next chord"""
-    if session_id not in active_sessions:
+    if session_id not in session_store:
         return jsonify({"error": "Session not found"}), 404
     
+    # Whatever we were listening for is no longer the current chord
+    verification_jobs.cancel_owner(session_id)
     has_more = advance_chord(session_id)
     next_chord = get_current_chord(session_id) if has_more else None
     
-    print(f"⏭️ Skipped to next chord: {next_chord}")
+    logger.info("⏭️ Session %s skipped to next chord: %s", session_id, next_chord)
     
     return jsonify({
         "success": True,
@@ -399,11 +830,216 @@ def skip_chord(session_id):
         "session_complete": not has_more
     })
 
+@app.route('/session/<session_id>', methods=['DELETE'])
+def delete_session(session_id):
+    """End a session and release its tracking state"""
+    if end_session(session_id) is None:
+        return jsonify({"error": "Session not found"}), 404
+    
+    logger.info("🗑️ Ended session %s", session_id)
+    return jsonify({"success": True, "session_id": session_id})
+
+# Binary frame streaming - socket.io namespace for clients that keep a connection open
+STREAM_NAMESPACE = "/stream"
+stream_clients = {}
+
+def compact_overlay(current_chord, guitar_detected, overlay_positions, seq=None):
+    """Minimal overlay payload: positions as [x, y, fret, string] rows"""
+    return {
+        "seq": seq,
+        "chord": current_chord,
+        "detected": guitar_detected,
+        "positions": [[p["x"], p["y"], p["fret"], p["string"]] for p in overlay_positions]
+    }
+
+# Live mode - after 'live', a stream client's frames and 'pcm' audio blocks are
+# processed side by side on the session runtime; results come back as 'state'.
+LIVE_WORKERS = int(os.environ.get("CV_LIVE_WORKERS", "8"))
+LIVE_VISION_GRACE = float(os.environ.get("CV_LIVE_VISION_GRACE", "1.0"))
+live_clients = {}
+
+def live_detect(session_id, image_bytes, seq):
+    """Runtime vision step: one frame -> compact overlay"""
+    started = time.perf_counter()
+    current_chord = get_current_chord(session_id)
+    if not current_chord:
+        payload = compact_overlay(None, False, [], seq)
+        payload["complete"] = True
+        return payload
+    
+    frame = decode_frame(image_bytes)
+    if frame is None:
+        FRAME_ERRORS_TOTAL.inc(transport="live", reason="decode")
+        raise ValueError("Failed to decode image")
+    
+    guitar_detected, overlay_positions, _ = process_frame_with_yolo(frame, current_chord, session_id)
+    FRAME_SECONDS.observe(time.perf_counter() - started, transport="live")
+    return compact_overlay(current_chord, guitar_detected, overlay_positions, seq)
+
+def live_confirm(session_id, chord):
+    """Runtime listening step: the expected chord was heard"""
+    response = apply_verification_result(session_id, chord, True)
+    if response is not None:
+        verification_jobs.cancel_owner(session_id)
+    return response
+
+def live_push(session_id, state):
+    socketio.emit('state', state, to=session_id, namespace=STREAM_NAMESPACE)
+
+live_runtime = SessionRuntime(
+    live_detect, live_confirm, live_push,
+    workers=LIVE_WORKERS,
+    vision_grace=LIVE_VISION_GRACE,
+    min_duration=AUDIO_MIN_SECONDS
+)
+REGISTRY.gauge(
+    "cv_live_sessions", "Sessions running vision and listening on the live runtime",
+    function=live_runtime.session_count)
+
+@socketio.on('join', namespace=STREAM_NAMESPACE)
+def stream_join(data):
+    """Bind this connection to a practice session before streaming frames"""
+    session_id = (data or {}).get('session_id')
+    if not session_id or session_id not in session_store:
+        emit('stream_error', {"error": "Invalid session"})
+        return
+    
+    stream_clients[request.sid] = session_id
+    join_room(session_id)
+    logger.info("🔌 Stream client joined session %s", session_id)
+    emit('joined', {"session_id": session_id, "current_chord": get_current_chord(session_id)})
+
+@socketio.on('frame', namespace=STREAM_NAMESPACE)
+def stream_frame(image_bytes, seq=None):
+    """Raw JPEG bytes in, compact overlay out (emitted as 'overlay')"""
+    started = time.perf_counter()
+    FRAMES_TOTAL.inc(transport="stream")
+    session_id = stream_clients.get(request.sid)
+    if session_id is None:
+        emit('stream_error', {"error": "join a session first", "seq": seq})
+        return
+    if not isinstance(image_bytes, (bytes, bytearray)):
+        emit('stream_error', {"error": "frame must be binary JPEG data", "seq": seq})
+        return
+    
+    if live_runtime.is_live(session_id):
+        # The runtime keeps only the newest frame, so no admission check is needed
+        live_runtime.feed_frame(session_id, bytes(image_bytes), seq)
+        return
+    
+    skipped = admit_frame(session_id, "stream")
+    if skipped is not None:
+        skipped["seq"] = seq
+        emit('overlay', skipped)
+        return
+    
+    try:
+        current_chord = get_current_chord(session_id)
+        if not current_chord:
+            payload = compact_overlay(None, False, [], seq)
+            payload["complete"] = True
+            payload.update(admission.advice(session_id))
+            emit('overlay', payload)
+            return
+        
+        frame = decode_frame(image_bytes)
+        if frame is None:
+            FRAME_ERRORS_TOTAL.inc(transport="stream", reason="decode")
+            emit('stream_error', {"error": "Failed to decode image", "seq": seq, **admission.advice(session_id)})
+            return
+        
+        guitar_detected, overlay_positions, _ = process_frame_with_yolo(frame, current_chord, session_id)
+        payload = compact_overlay(current_chord, guitar_detected, overlay_positions, seq)
+        payload.update(admission.advice(session_id))
+        emit('overlay', payload)
+        FRAME_SECONDS.observe(time.perf_counter() - started, transport="stream")
+    except Exception as e:
+        FRAME_ERRORS_TOTAL.inc(transport="stream", reason="processing")
+        logger.exception("❌ Stream detection error: %s", e)
+        emit('stream_error', {"error": str(e), "seq": seq})
+    finally:
+        frame_done(session_id, started)
+
+@socketio.on('audio', namespace=STREAM_NAMESPACE)
+def stream_audio(clip, meta=None):
+    """Binary audio clip in, verification result out (emitted as 'verification')"""
+    session_id = stream_clients.get(request.sid)
+    if session_id is None:
+        emit('stream_error', {"error": "join a session first"})
+        return
+    if not isinstance(clip, (bytes, bytearray)):
+        emit('stream_error', {"error": "audio must be binary data"})
+        return
+    
+    meta = meta or {}
+    try:
+        response, status = verify_clip(
+            session_id, bytes(clip), meta.get('content_type', 'audio/wav'),
+            sr=meta.get('sr'), channels=meta.get('channels', 1),
+            sample_format=meta.get('format', 's16le')
+        )
+    except Exception as e:
+        logger.exception("❌ Stream clip verification error: %s", e)
+        response, status = {"error": "Verification failed"}, 500
+    
+    response = dict(response, session_id=session_id, seq=meta.get('seq'))
+    emit('verification' if status == 200 else 'stream_error', response)
+
+@socketio.on('live', namespace=STREAM_NAMESPACE)
+def stream_live(meta=None):
+    """Switch this connection to live mode; `meta` describes the 'pcm' blocks (sr, channels, format)"""
+    session_id = stream_clients.get(request.sid)
+    if session_id is None:
+        emit('stream_error', {"error": "join a session first"})
+        return
+    
+    meta = meta or {}
+    sample_format = meta.get('format', 'f32le')
+    try:
+        sr, channels = pcm_layout(meta.get('sr', 22050), meta.get('channels', 1), sample_format)
+    except ClipError as e:
+        emit('stream_error', {"error": str(e)})
+        return
+    
+    live_clients[request.sid] = (session_id, sr, channels, sample_format)
+    live_runtime.open(session_id, sr)
+    emit('live_started', {"session_id": session_id, "current_chord": get_current_chord(session_id),
+                          "sr": sr, "channels": channels, "format": sample_format})
+
+@socketio.on('pcm', namespace=STREAM_NAMESPACE)
+def stream_pcm(block):
+    """One block of raw PCM audio for a live session"""
+    live = live_clients.get(request.sid)
+    if live is None:
+        emit('stream_error', {"error": "start live mode first"})
+        return
+    if not isinstance(block, (bytes, bytearray)):
+        emit('stream_error', {"error": "pcm must be binary data"})
+        return
+    
+    session_id, sr, channels, sample_format = live
+    try:
+        samples, _ = decode_pcm(bytes(block), sr, channels, sample_format)
+    except ClipError as e:
+        emit('stream_error', {"error": str(e)})
+        return
+    live_runtime.feed_audio(session_id, samples)
+
+@socketio.on('disconnect', namespace=STREAM_NAMESPACE)
+def stream_disconnect():
+    session_id = stream_clients.pop(request.sid, None)
+    if live_clients.pop(request.sid, None) is not None:
+        live_runtime.close(session_id)
+    if session_id is not None:
+        leave_room(session_id)
+        logger.info("🔌 Stream client left session %s", session_id)
+
 if __name__ == '__main__':
-    print("🎸 StrumSpace CV Service - Using Working YOLO Configuration")
-    print(f"✅ YOLO model loaded with {len(model.names)} classes")
-    print(f"🎵 Chord data loaded: {list(chord_data.keys())}")
-    print(f"🎯 Label mapping: {label_to_fret}")
-    print("🚀 Starting Flask server on http://localhost:5001")
+    logger.info("🎸 StrumSpace CV Service - Using Working YOLO Configuration")
+    if MODELS.ready("detector"):
+        logger.info("✅ YOLO model loaded with %d classes", len(get_detector().names))
+    logger.info("📦 Inference batching: up to %d frames, %sms max wait", YOLO_MAX_BATCH_SIZE, YOLO_MAX_WAIT_MS)
+    logger.info("🚀 Starting Flask server on http://localhost:5001")
+    logger.info("🔌 Frame streaming on ws://localhost:5001%s", STREAM_NAMESPACE)
     
-    app.run(host='0.0.0.0', port=5001, debug=True)
+    socketio.run(app, host='0.0.0.0', port=5001, debug=True, allow_unsafe_werkzeug=True)
@@ -1,10 +1,25 @@
-import cv2
+import argparse
 import json
-from ultralytics import YOLO
+import cv2
+from utils.chord_geometry import ChordTable
+from utils.models import get_detector
 from utils.overlay import draw_fretboard_overlay
+from utils.pipeline import FrameSource, LivePipeline
 
-# Load YOLO model
-model = YOLO("assets/models/best.pt")
+# Live webcam mode: capture, inference and rendering run as separate stages,
+# so a slow model call drops stale frames instead of delaying the camera.
+#   python test.py                         # webcam 0
+#   python test.py --source clip.mp4       # video file, paced to its fps
+#   python test.py --source clip.mp4 --no-display --fast   # benchmark
+parser = argparse.ArgumentParser(description="Live fretboard + chord overlay")
+parser.add_argument("--source", default="0", help="camera index or video file (default: 0)")
+parser.add_argument("--no-display", action="store_true", help="skip the preview window")
+parser.add_argument("--fast", action="store_true", help="read video files as fast as possible")
+parser.add_argument("--max-frames", type=int, default=None, help="stop after this many captured frames")
+args = parser.parse_args()
+
+# Load YOLO model (backend from CV_MODEL_BACKEND, see utils/inference.py)
+model = get_detector()
 print("✅ YOLO model loaded")
 print("📦 Classes:", model.names)
 
@@ -12,54 +27,61 @@ print("📦 Classes:", model.names)
 label_to_fret = {f"Zone{i}": i for i in range(1, 13)}  # Adjust max zone as needed
 
 # Load chord data
-with open("assets/data/chords.json") as f:
-    chord_data = json.load(f)
+chord_data = ChordTable.from_json("assets/data/chords.json")
 
-chord_sequence = list(chord_data.keys())
+chord_sequence = list(chord_data.names)
 current_chord_idx = 0
 current_chord = chord_sequence[current_chord_idx]
 
-# Webcam setup
-cap = cv2.VideoCapture(0)
-if not cap.isOpened():
-    print("❌ Camera not detected.")
-    exit()
-
-while True:
-    ret, frame = cap.read()
-    if not ret:
-        break
-
-    results = model(frame)
+def detect(frame):
+    detections = model.detect([frame])[0]
     fret_boxes = {}
 
-    for r in results:
-        for box in r.boxes:
-            cls_id = int(box.cls[0])
-            label = model.names[cls_id]
-            conf = float(box.conf[0])
-            bbox = box.xyxy[0].cpu().numpy().astype(int)
-            x1, y1, x2, y2 = bbox
+    for label, conf, bbox in detections:
+        if label in label_to_fret and conf > 0.5:
+            fret_boxes[label_to_fret[label]] = bbox.astype(int)
+
+    return fret_boxes
 
-            if label in label_to_fret and conf > 0.5:
-                fret_num = label_to_fret[label]
-                fret_boxes[fret_num] = [x1, y1, x2, y2]
-                # Removed bounding box and label display
+def render(frame, fret_boxes):
+    global current_chord_idx, current_chord
 
     frame = draw_fretboard_overlay(frame, chord_data, current_chord, fret_boxes)
 
     cv2.putText(frame, f"Play: {current_chord}", (30, 40),
                 cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 255, 0), 2)
 
+    if args.no_display:
+        return True
+
     cv2.imshow("Fretboard + Chord Overlay", frame)
 
     key = cv2.waitKey(1)
     if key == ord("q"):
-        break
+        return False
     elif key == ord("n"):
         current_chord_idx = (current_chord_idx + 1) % len(chord_sequence)
         current_chord = chord_sequence[current_chord_idx]
         print(f"🔁 Switched to: {current_chord}")
+    return True
+
+def report(stats):
+    latency = stats.get("latency_ms", {})
+    print(f"📊 {stats.get('recent_render_fps', stats['render_fps']):.1f} fps | "
+          f"latency p50 {latency.get('p50', 0):.0f}ms p95 {latency.get('p95', 0):.0f}ms | "
+          f"dropped {stats['dropped_before_inference']}+{stats['dropped_before_render']}")
+
+try:
+    source = FrameSource(args.source, realtime=not args.fast)
+except IOError as e:
+    print(f"❌ {e}")
+    exit()
+
+pipeline = LivePipeline(source, detect, render, max_frames=args.max_frames)
+final = pipeline.run(on_stats=report)
+
+if not args.no_display:
+    cv2.destroyAllWindows()
 
-cap.release()
-cv2.destroyAllWindows()
+print("🏁 Final stats:")
+print(json.dumps(final, indent=2))
@@ -0,0 +1,10 @@
+import os
+import sys
+
+# Tests import the service modules the same way main.py does (`from utils...`)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# main.py reads its config at import: run it on the stub detector, quietly, without batching delays
+os.environ.setdefault("CV_MODEL_BACKEND", "stub")
+os.environ.setdefault("CV_LOG_LEVEL", "WARNING")
+os.environ.setdefault("CV_MAX_BATCH_WAIT_MS", "0")
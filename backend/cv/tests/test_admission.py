@@ -0,0 +1,31 @@
+import base64
+import cv2
+import main
+from utils.admission import AdmissionController
+from utils.benchmark import synthetic_frame
+
+
+def test_shed_detect_frames_are_not_2xx():
+    client = main.app.test_client()
+    main.create_session("shed")
+    image = base64.b64encode(cv2.imencode(".jpg", synthetic_frame(320, 240))[1].tobytes()).decode()
+    replies = [client.post("/detect", json={"session_id": "shed", "image": image}) for _ in range(2)]
+
+    assert replies[0].status_code == 200
+    assert replies[0].get_json()["guitar_detected"]
+    # Sent right after the first, well inside the advised interval
+    assert replies[1].status_code == 429
+    body = replies[1].get_json()
+    assert body["skipped"] and body["reason"] == "too_soon"
+    assert "recommended_interval_ms" in body and "recommended_width" in body
+
+
+def test_forgetting_a_busy_session_keeps_the_in_flight_count():
+    admission = AdmissionController()
+    assert admission.admit("a") is None
+    admission.forget("a")
+    assert admission.admit("b") is None
+    admission.done("a", 0.01)
+    assert admission.in_flight() == 1
+    admission.done("b", 0.01)
+    assert admission.in_flight() == 0
@@ -0,0 +1,40 @@
+import threading
+import pytest
+from utils.batcher import MicroBatcher
+
+
+def double_unless_bad(payloads):
+    if "bad" in payloads:
+        raise ValueError("bad input")
+    return [p * 2 for p in payloads]
+
+
+def test_failed_batch_only_fails_the_bad_item():
+    batcher = MicroBatcher(double_unless_bad, max_batch_size=8, max_wait_ms=200)
+    payloads = [1, 2, "bad", 3]
+    results = {}
+
+    def submit(payload):
+        try:
+            results[payload] = batcher.submit(payload, timeout=5)
+        except ValueError as e:
+            results[payload] = e
+
+    threads = [threading.Thread(target=submit, args=(p,)) for p in payloads]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    batcher.stop()
+
+    assert results[1] == 2 and results[2] == 4 and results[3] == 6
+    assert isinstance(results["bad"], ValueError)
+    assert batcher.stats()["split_batches"] == 1
+
+
+def test_single_item_error_is_raised_to_its_caller():
+    batcher = MicroBatcher(double_unless_bad, max_wait_ms=0)
+    with pytest.raises(ValueError):
+        batcher.submit("bad", timeout=5)
+    assert batcher.submit(5, timeout=5) == 10
+    batcher.stop()
@@ -0,0 +1,14 @@
+import os
+
+# Same defaults as `python -m utils.benchmark`; must be set before main is imported
+os.environ.setdefault("CV_MODEL_BACKEND", "stub")
+os.environ.setdefault("CV_LOG_LEVEL", "WARNING")
+os.environ.setdefault("CV_MAX_BATCH_WAIT_MS", "0")
+
+from utils.benchmark import run  # noqa: E402
+
+
+def test_every_benchmark_case_runs():
+    report = run(repeat=1, warmup=0)
+    assert report["results"]
+    assert all(result["runs"] == 1 for result in report["results"].values())
@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+from utils.audio_chord_detector import (CHORD_NAMES, detect_chord, expected_chord_match, extract_chroma,
+                                        listen_for_chord, matches_chord, score_clips)
+from utils.audio_stream import ArraySource
+from utils.benchmark import SR, synth_chord
+
+
+@pytest.mark.parametrize("chord", CHORD_NAMES)
+def test_synthesized_chord_is_detected(chord):
+    for seed in (0, 1):
+        chroma = extract_chroma(synth_chord(chord, 1.0, seed=seed), SR)
+        assert detect_chord(chroma) == chord
+        assert matches_chord(chroma, chord)[0]
+
+
+@pytest.mark.parametrize("chord", ["Am", "C", "G", "D", "A", "D7", "G7", "Em"])
+def test_listening_confirms_practice_chords(chord):
+    matched, confidence, _ = listen_for_chord(chord, ArraySource(synth_chord(chord, 1.0), SR))
+    assert matched, confidence
+
+
+def test_batched_clip_scoring_matches_expected_chord():
+    chords = ["Am", "C", "G", "D", "Em", "A", "D7", "G7"]
+    _, scores = score_clips([(synth_chord(c, 1.0), SR) for c in chords])
+    for column, chord in zip(scores.T, chords):
+        assert expected_chord_match(column, chord)[0]
+
+
+@pytest.mark.parametrize("played, expected", [("C", "Am"), ("G", "C"), ("Am", "Em"), ("D", "A")])
+def test_other_chord_is_not_accepted(played, expected):
+    chroma = extract_chroma(synth_chord(played, 1.0), SR)
+    assert not matches_chord(chroma, expected)[0]
+
+
+def test_noise_is_unknown():
+    noise = np.random.default_rng(0).standard_normal(SR).astype(np.float32)
+    assert detect_chord(extract_chroma(noise, SR)) == "Unknown"
@@ -0,0 +1,29 @@
+import numpy as np
+import pytest
+from utils.audio_chord_detector import extract_chroma
+from utils.benchmark import SR, synth_chord
+from utils.chroma import chroma_filterbank, chroma_stft
+
+# librosa is only the reference implementation; skip the comparison without it
+librosa = pytest.importorskip("librosa")
+
+
+@pytest.mark.parametrize("sr, n_fft", [(22050, 2048), (16000, 1024), (44100, 4096)])
+def test_filterbank_matches_librosa(sr, n_fft):
+    expected = librosa.filters.chroma(sr=sr, n_fft=n_fft, tuning=0.0)
+    np.testing.assert_allclose(chroma_filterbank(sr, n_fft), expected, atol=1e-6)
+
+
+@pytest.mark.parametrize("sr", [16000, 22050, 44100])
+def test_chroma_stft_matches_librosa_on_noise(sr):
+    y = np.random.default_rng(1).standard_normal(sr).astype(np.float32)
+    expected = librosa.feature.chroma_stft(y=y, sr=sr, tuning=0.0)
+    np.testing.assert_allclose(chroma_stft(y, sr), expected, atol=1e-5)
+
+
+@pytest.mark.parametrize("chord", ["Am", "C", "G", "D7"])
+def test_chroma_stft_matches_librosa_on_chords(chord):
+    y = synth_chord(chord, 2.0)
+    expected = librosa.feature.chroma_stft(y=y, sr=SR, tuning=0.0)
+    np.testing.assert_allclose(chroma_stft(y, SR), expected, atol=1e-5)
+    np.testing.assert_allclose(extract_chroma(y, SR), extract_chroma(y, SR, backend="librosa"), atol=1e-5)
@@ -0,0 +1,21 @@
+import cv2
+import numpy as np
+from utils.benchmark import synthetic_frame
+from utils.frame_cache import FrameCache
+
+
+def test_same_picture_is_reused():
+    cache = FrameCache(max_age=10)
+    frame = synthetic_frame(640, 480)
+    boxes = {1: np.array([10, 10, 50, 40])}
+    cache.store(cache.signature(frame), boxes)
+    assert cache.lookup(cache.signature(frame.copy())) is boxes
+
+
+def test_resized_picture_is_a_miss():
+    cache = FrameCache(max_age=10)
+    frame = synthetic_frame(640, 480)
+    cache.store(cache.signature(frame), {1: np.array([10, 400, 50, 470])})
+    smaller = cv2.resize(frame, (320, 240), interpolation=cv2.INTER_AREA)
+    assert cache.lookup(cache.signature(smaller)) is None
+    assert cache.misses == 1
@@ -0,0 +1,24 @@
+import numpy as np
+from utils.fretboard_model import FretboardModel
+
+# Fret wires follow the 2^(-n/12) law along a vertical neck
+WIRES = 80 + 600 * (1 - 2.0 ** (-np.arange(13) / 12))
+TRUTH = {f: np.array([200, int(WIRES[f - 1]), 300, int(WIRES[f])]) for f in range(1, 13)}
+
+
+def test_missing_frets_are_filled_from_the_fit():
+    model = FretboardModel(snap=0.0)
+    detected = {f: TRUTH[f] for f in (2, 4, 5, 7, 9)}
+    completed = model.complete(detected, (720, 1280, 3))
+    assert sorted(completed) == list(range(1, 13))
+    assert max(np.abs(completed[f] - TRUTH[f]).max() for f in completed) <= 2
+
+
+def test_fit_restarts_when_the_frame_size_changes():
+    model = FretboardModel(snap=0.0)
+    model.complete({f: TRUTH[f] for f in (2, 4, 5, 7, 9)}, (720, 1280, 3))
+    half = {f: TRUTH[f] // 2 for f in (3, 6)}
+    completed = model.complete(half, (360, 640, 3))
+    assert model.resets == 1
+    # Two frets aren't enough for a fresh fit: nothing from the old size is filled in
+    assert sorted(completed) == [3, 6]
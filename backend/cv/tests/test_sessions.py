@@ -0,0 +1,40 @@
+import time
+import pytest
+from utils.sessions import TTLCache, open_session_store
+
+
+def test_idle_entry_expires_on_lookup():
+    cache = TTLCache(capacity=10, ttl=0.05)
+    evicted = []
+    cache.on_evict(lambda key, value: evicted.append((key, value)))
+    cache.set("a", 1)
+    assert cache.get("a") == 1
+    time.sleep(0.1)
+    assert "a" not in cache
+    assert cache.get("a") is None
+    assert evicted == [("a", 1)]
+
+
+def test_get_or_create_replaces_expired_entry():
+    cache = TTLCache(capacity=10, ttl=0.05)
+    evicted = []
+    cache.on_evict(lambda key, value: evicted.append(key))
+    cache.get_or_create("a", lambda: "old")
+    time.sleep(0.1)
+    assert cache.get_or_create("a", lambda: "new") == "new"
+    assert evicted == ["a"]
+
+
+@pytest.mark.parametrize("backend", ["memory", "sqlite"])
+def test_idle_session_expires_on_lookup(backend, tmp_path):
+    store = open_session_store(backend, path=str(tmp_path / "sessions.db"), ttl=0.05)
+    evicted = []
+    store.on_evict(evicted.append)
+    store.create("s1", "easy", ["Am", "C"])
+    store.create("s2", "easy", ["Am", "C"])
+    assert store.get("s1") is not None
+    time.sleep(0.1)
+    assert "s1" not in store
+    assert store.update("s2", lambda session: session.advance()) is None
+    assert store.get("s1") is None and store.get("s2") is None
+    assert sorted(evicted) == ["s1", "s2"]
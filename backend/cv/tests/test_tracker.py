@@ -0,0 +1,73 @@
+import base64
+import cv2
+import numpy as np
+import pytest
+import main
+from utils.benchmark import synthetic_frame
+from utils.tracker import GuitarTracker
+
+
+@pytest.fixture
+def client(monkeypatch):
+    # Frames are sent back to back; pacing is tested separately
+    monkeypatch.setattr(main, "ADMISSION_ENABLED", False)
+    return main.app.test_client()
+
+
+def post_frame(client, session_id, frame):
+    image = base64.b64encode(cv2.imencode(".jpg", frame)[1].tobytes()).decode()
+    return client.post("/detect", json={"session_id": session_id, "image": image})
+
+
+def test_session_survives_frame_size_change(client):
+    main.create_session("resize")
+    for width, height, count in ((640, 480, 2), (320, 240, 30), (1280, 720, 3)):
+        for seed in range(count):
+            response = post_frame(client, "resize", synthetic_frame(width, height, seed % 8))
+            assert response.status_code == 200, response.get_json()
+            body = response.get_json()
+            assert body["guitar_detected"]
+            assert all(0 <= p["x"] < width and 0 <= p["y"] < height for p in body["chord_positions"])
+
+
+def test_tracker_takes_a_keyframe_when_the_size_changes():
+    tracker = GuitarTracker(model=object(), keyframe_interval=100)
+    detect = lambda frame: {1: np.array([10, 10, 60, 40])}
+    _, is_keyframe = tracker.update(synthetic_frame(640, 480), detect)
+    assert is_keyframe
+    _, is_keyframe = tracker.update(synthetic_frame(320, 240), detect)
+    assert is_keyframe
+
+
+def recording_infer(calls):
+    from utils.inference import StubDetector
+    stub = StubDetector()
+
+    def infer(image, imgsz):
+        calls.append((image.shape[:2], imgsz))
+        return stub.detect([image])[0]
+    return infer
+
+
+def test_roi_box_is_dropped_when_the_size_changes():
+    tracker = GuitarTracker(model=object())
+    calls = []
+    infer = recording_infer(calls)
+    tracker.detect_roi(synthetic_frame(1280, 720), infer)
+    tracker.detect_roi(synthetic_frame(1280, 720), infer)
+    assert calls[-1][1] == tracker.roi_imgsz
+
+    detections = tracker.detect_roi(synthetic_frame(320, 240), infer)
+    assert calls[-1] == ((240, 320), None)
+    assert all(bbox[3] <= 240 and bbox[2] <= 320 for _, _, bbox in detections)
+
+
+def test_degenerate_roi_window_falls_back_to_full_frame():
+    tracker = GuitarTracker(model=object())
+    calls = []
+    frame = synthetic_frame(320, 240)
+    tracker.fretboard_box = (400, 300, 500, 320)  # entirely below and right of the frame
+    tracker.fretboard_shape = frame.shape[:2]
+    tracker.detect_roi(frame, recording_infer(calls))
+    assert calls == [((240, 320), None)]
+    assert tracker.roi_fallbacks == 1
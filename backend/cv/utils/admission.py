@@ -0,0 +1,158 @@
+import threading
+import time
+
+# Reasons a frame is shed before any decoding or inference happens
+BUSY = "busy"              # the session's previous frame is still being processed
+TOO_SOON = "too_soon"      # the client is sending faster than it was told to
+OVERLOADED = "overloaded"  # the service as a whole is at its in-flight limit
+
+
+class _SessionLoad:
+    __slots__ = ("in_flight", "last_admitted", "latency", "last_seen")
+
+    def __init__(self):
+        self.in_flight = False
+        self.last_admitted = 0.0
+        self.latency = None
+        self.last_seen = time.monotonic()
+
+
+class AdmissionController:
+    """Backpressure for frame streams: sheds excess frames and advises clients.
+
+    Each session may have one frame in flight; frames that arrive while it's
+    busy, much sooner than the advised interval, or while the service is at
+    `max_in_flight` are rejected before decoding. Processing latency is
+    smoothed per session and globally. The advised capture interval backs off
+    multiplicatively while latency exceeds `target_latency_ms` (or the
+    in-flight limit is near) and recovers additively once there's headroom;
+    the advised width steps down through `widths` as the interval grows.
+    """
+
+    def __init__(self, target_latency_ms=150, max_in_flight=32, min_interval_ms=66, max_interval_ms=1000,
+                 widths=(640, 480, 320), smoothing=0.2, adjust_every=0.25, idle_timeout=30.0):
+        self.target_latency = target_latency_ms / 1000.0
+        self.max_in_flight = max(1, int(max_in_flight))
+        self.min_interval = min_interval_ms / 1000.0
+        self.max_interval = max(max_interval_ms / 1000.0, self.min_interval)
+        self.widths = tuple(sorted(widths, reverse=True))
+        self.smoothing = smoothing
+        self.adjust_every = adjust_every
+        self.idle_timeout = idle_timeout
+
+        self._lock = threading.Lock()
+        self._sessions = {}
+        self._in_flight = 0
+        self._latency = None
+        self._interval = self.min_interval
+        self._last_adjust = time.monotonic()
+        self._last_prune = time.monotonic()
+        self.admitted = 0
+        self.shed = {BUSY: 0, TOO_SOON: 0, OVERLOADED: 0}
+
+    def admit(self, session_id):
+        """None if the frame may be processed (call done() afterwards), else the reason it's shed"""
+        now = time.monotonic()
+        with self._lock:
+            self._prune(now)
+            state = self._sessions.get(session_id)
+            if state is None:
+                state = self._sessions[session_id] = _SessionLoad()
+            state.last_seen = now
+
+            if state.in_flight:
+                reason = BUSY
+            elif self._in_flight >= self.max_in_flight:
+                reason = OVERLOADED
+            elif now - state.last_admitted < 0.5 * self._session_interval(state):
+                reason = TOO_SOON
+            else:
+                state.in_flight = True
+                state.last_admitted = now
+                self._in_flight += 1
+                self.admitted += 1
+                return None
+            self.shed[reason] += 1
+            return reason
+
+    def done(self, session_id, seconds):
+        """Record how long an admitted frame took end to end; call exactly once per admitted frame"""
+        now = time.monotonic()
+        with self._lock:
+            self._in_flight = max(0, self._in_flight - 1)
+            state = self._sessions.get(session_id)
+            if state is not None:
+                state.in_flight = False
+                state.latency = self._smooth(state.latency, seconds)
+            self._latency = self._smooth(self._latency, seconds)
+            if now - self._last_adjust >= self.adjust_every:
+                self._adjust(now)
+
+    def forget(self, session_id):
+        """Drop a session's pacing state; a frame still in flight is released by its done()"""
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def advice(self, session_id=None):
+        """{"recommended_interval_ms", "recommended_width"} for a session's next frame"""
+        with self._lock:
+            state = self._sessions.get(session_id) if session_id is not None else None
+            interval = self._session_interval(state) if state is not None else self._interval
+            return {
+                "recommended_interval_ms": int(round(interval * 1000.0)),
+                "recommended_width": self._width(interval),
+            }
+
+    def in_flight(self):
+        with self._lock:
+            return self._in_flight
+
+    def stats(self):
+        with self._lock:
+            return {
+                "in_flight": self._in_flight,
+                "max_in_flight": self.max_in_flight,
+                "sessions": len(self._sessions),
+                "latency_ms": round(self._latency * 1000.0, 1) if self._latency is not None else None,
+                "target_latency_ms": self.target_latency * 1000.0,
+                "recommended_interval_ms": int(round(self._interval * 1000.0)),
+                "recommended_width": self._width(self._interval),
+                "admitted": self.admitted,
+                "shed": dict(self.shed),
+            }
+
+    def _smooth(self, previous, value):
+        if previous is None:
+            return value
+        return previous + self.smoothing * (value - previous)
+
+    def _session_interval(self, state):
+        # A session can't usefully send faster than its own frames come back
+        own = state.latency if state is not None and state.latency is not None else 0.0
+        return min(self.max_interval, max(self._interval, own))
+
+    def _adjust(self, now):
+        self._last_adjust = now
+        latency = self._latency or 0.0
+        pressure = max(latency / self.target_latency, self._in_flight / self.max_in_flight)
+        if pressure > 1.0:
+            self._interval = min(self.max_interval, self._interval * 1.25)
+        elif pressure < 0.7:
+            self._interval = max(self.min_interval, self._interval - 0.01)
+
+    def _width(self, interval):
+        # Each doubling of the interval over its minimum drops one width step
+        step = 0
+        threshold = 2 * self.min_interval
+        while step < len(self.widths) - 1 and interval >= threshold:
+            step += 1
+            threshold *= 2
+        return self.widths[step]
+
+    def _prune(self, now):
+        if now - self._last_prune < self.idle_timeout:
+            return
+        self._last_prune = now
+        for session_id in [s for s, st in self._sessions.items()
+                           if not st.in_flight and now - st.last_seen > self.idle_timeout]:
+            del self._sessions[session_id]
@@ -1,74 +1,277 @@
-import sounddevice as sd
-import librosa
+import logging
 import numpy as np
 import time
 from numpy.linalg import norm
+from utils.audio_stream import DeviceSource, StreamingChromaEngine
+from utils.chroma import chroma_filterbank, chroma_stft, frame_signal, power_spectrogram
 
-# Define chord templates (simplified triads)
-CHORDS = {
-    "C": [0, 4, 7],     # C, E, G
-    "G": [7, 11, 2],    # G, B, D
-    "D": [2, 6, 9],     # D, F#, A
-    "A": [9, 1, 4],     # A, C#, E
-    "E": [4, 8, 11],    # E, G#, B
-    "Em": [4, 7, 11],   # E, G, B
-    "Am": [9, 0, 4],    # A, C, E
-    "Dm": [2, 5, 9]     # D, F, A
-}
+logger = logging.getLogger(__name__)
 
 NOTE_NAMES = ['C', 'C#', 'D', 'D#', 'E', 'F',
               'F#', 'G', 'G#', 'A', 'A#', 'B']
 
+# Chord qualities as pitch-class intervals above the root
+CHORD_QUALITIES = {
+    "": [0, 4, 7],           # major
+    "m": [0, 3, 7],          # minor
+    "7": [0, 4, 7, 10],      # dominant 7th
+    "maj7": [0, 4, 7, 11],   # major 7th
+    "m7": [0, 3, 7, 10],     # minor 7th
+}
+
+# Define chord templates - every root in every quality, e.g. "C", "Am", "D7", "Gmaj7", "Em7"
+CHORDS = {
+    f"{NOTE_NAMES[root]}{suffix}": [(root + i) % 12 for i in intervals]
+    for suffix, intervals in CHORD_QUALITIES.items()
+    for root in range(12)
+}
+
+CHORD_NAMES = list(CHORDS.keys())
+CHORD_INDEX = {name: i for i, name in enumerate(CHORD_NAMES)}
+
+# Each chord tone contributes its first few harmonics with decaying weight,
+# e.g. the 3rd harmonic of F# lands on C#. Binary templates mistake those
+# overtones for a 7th and report C as Cmaj7.
+TEMPLATE_HARMONICS = 4
+TEMPLATE_HARMONIC_DECAY = 0.6
+
+# One unit-norm row per chord, so a single matrix product scores every template
+CHORD_TEMPLATES = np.zeros((len(CHORD_NAMES), 12))
+for _i, _indices in enumerate(CHORDS.values()):
+    for _pitch_class in _indices:
+        for _h in range(1, TEMPLATE_HARMONICS + 1):
+            CHORD_TEMPLATES[_i, (_pitch_class + round(12 * np.log2(_h))) % 12] += TEMPLATE_HARMONIC_DECAY ** (_h - 1)
+CHORD_TEMPLATES /= norm(CHORD_TEMPLATES, axis=1, keepdims=True)
+
+CHORD_THRESHOLD = 0.7
+
+# A four-note chord contains its triad, so it needs to beat it by this much
+# to be reported; otherwise the simpler chord wins the tie.
+EXTENDED_CHORD_PENALTY = 0.02
+CHORD_PRIOR = np.array([-EXTENDED_CHORD_PENALTY if len(tones) > 3 else 0.0 for tones in CHORDS.values()])
+
+# The expected chord is accepted if it ranks within this of the best chord
+CHORD_MATCH_MARGIN = 0.01
+
 
 def record_audio(duration=2, fs=22050):
-    print(f"🎤 Recording for {duration} seconds...")
+    import sounddevice as sd
+
+    logger.info("🎤 Recording for %s seconds...", duration)
     audio = sd.rec(int(duration * fs), samplerate=fs, channels=1, dtype='float32')
     sd.wait()
     return audio.flatten(), fs
 
 
-def extract_chroma(audio, sr):
-    chroma = librosa.feature.chroma_stft(y=audio, sr=sr)
+def extract_chroma_frames(audio, sr, backend="numpy"):
+    """(12, n_frames) chroma; backend="librosa" is the slower reference implementation"""
+    if backend == "librosa":
+        import librosa
+        return librosa.feature.chroma_stft(y=audio, sr=sr, tuning=0.0)
+    if backend != "numpy":
+        raise ValueError(f"Unknown chroma backend: {backend}")
+    return chroma_stft(audio, sr)
+
+
+def extract_chroma(audio, sr, backend="numpy"):
+    chroma = extract_chroma_frames(audio, sr, backend)
     chroma_mean = np.mean(chroma, axis=1)
     chroma_norm = chroma_mean / np.max(chroma_mean)
     return chroma_norm
 
 
+def score_chords(chroma):
+    """Cosine similarity of chroma against every chord template.
+
+    `chroma` is a single (12,) vector or a (12, n_frames) matrix; the result
+    is (n_chords,) or (n_chords, n_frames) in CHORD_NAMES order.
+    """
+    chroma = np.asarray(chroma, dtype=float)
+    norms = norm(chroma, axis=0)
+    norms = np.where(norms > 0, norms, 1.0)
+    return CHORD_TEMPLATES @ (chroma / norms)
+
+
+def rank_chords(scores):
+    """Template scores adjusted by the chord prior; use for choosing, not as a confidence"""
+    scores = np.asarray(scores, dtype=float)
+    return scores + (CHORD_PRIOR if scores.ndim == 1 else CHORD_PRIOR[:, None])
+
+
 def detect_chord(chroma):
-    best_score = 0
-    best_match = "Unknown"
-
-    for chord, indices in CHORDS.items():
-        template = np.zeros(12)
-        for i in indices:
-            template[i] = 1
-        score = np.dot(chroma, template) / (norm(chroma) * norm(template))
-        if score > best_score:
-            best_score = score
-            best_match = chord
-
-    return best_match if best_score > 0.7 else "Unknown"
-
-
-def wait_for_chord(expected_chord, max_attempts=10):
-    print(f"🎯 Waiting until you play: {expected_chord}")
-    attempts = 0
-    while attempts < max_attempts:
-        audio, sr = record_audio(duration=2)
-        chroma = extract_chroma(audio, sr)
-        detected = detect_chord(chroma)
-
-        if detected == expected_chord:
-            print(f"✅ Correct! You played: {detected}")
-            return True
+    scores = score_chords(chroma)
+    best = int(np.argmax(rank_chords(scores)))
+    return CHORD_NAMES[best] if scores[best] > CHORD_THRESHOLD else "Unknown"
+
+
+def score_clips(clips, n_fft=2048, hop_length=512):
+    """Score many short clips against every template in one batched pass.
+
+    `clips` is a list of (samples, sr). Frames of all clips with the same
+    sample rate go through one FFT and one filterbank product; each clip is
+    then reduced to its mean chroma as in extract_chroma. Returns
+    (chroma (n_clips, 12), scores (n_chords, n_clips)).
+    """
+    chroma = np.zeros((len(clips), 12))
+    by_sr = {}
+    for i, (_, sr) in enumerate(clips):
+        by_sr.setdefault(sr, []).append(i)
+
+    for sr, indices in by_sr.items():
+        frames = [frame_signal(clips[i][0], n_fft, hop_length) for i in indices]
+        counts = np.array([len(f) for f in frames])
+        per_frame = chroma_filterbank(sr, n_fft) @ power_spectrogram(np.concatenate(frames), n_fft)
+        peaks = per_frame.max(axis=0)
+        per_frame /= np.where(peaks > np.finfo(np.float32).tiny, peaks, 1.0)
+        starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+        chroma[indices] = (np.add.reduceat(per_frame, starts, axis=1) / counts).T
+
+    peaks = chroma.max(axis=1, keepdims=True)
+    chroma /= np.where(peaks > 0, peaks, 1.0)
+    return chroma, score_chords(chroma.T)
+
+
+def chord_confidence(chroma, chord_name):
+    """Cosine similarity between a chroma vector and one chord's template"""
+    index = CHORD_INDEX.get(chord_name)
+    if index is None:
+        return 0.0
+    chroma = np.asarray(chroma, dtype=float)
+    denom = norm(chroma)
+    return float(CHORD_TEMPLATES[index] @ chroma / denom) if denom > 0 else 0.0
+
+
+def expected_chord_match(scores, expected_chord):
+    """(matched, confidence) for one (n_chords,) score vector.
+
+    The expected chord doesn't have to be the single best template, only
+    within CHORD_MATCH_MARGIN of it, so near-ties with a related chord
+    (C vs Cmaj7) don't reject a correctly played chord.
+    """
+    index = CHORD_INDEX.get(expected_chord)
+    if index is None:
+        return False, 0.0
+    confidence = float(scores[index])
+    ranked = rank_chords(scores)
+    return confidence > CHORD_THRESHOLD and ranked[index] >= ranked.max() - CHORD_MATCH_MARGIN, confidence
+
+
+def matches_chord(chroma, expected_chord):
+    """(matched, confidence): the running-chroma decision used while listening"""
+    return expected_chord_match(score_chords(chroma), expected_chord)
+
+
+def smooth_chord_sequence(chroma_frames, self_transition=0.9, temperature=0.05):
+    """Most likely chord per frame under an HMM with sticky transitions.
+
+    Emissions are exp(score / temperature) for every template plus an
+    "Unknown" state that scores CHORD_THRESHOLD, so frames that match nothing
+    well stay unlabelled. With uniform off-diagonal transitions each Viterbi
+    step only has to compare "stay" against "come from the best state",
+    which keeps decoding O(n_states * n_frames).
+    """
+    scores = score_chords(chroma_frames)
+    if scores.ndim == 1:
+        scores = scores[:, None]
+    n_frames = scores.shape[1]
+    if n_frames == 0:
+        return []
+
+    labels = CHORD_NAMES + ["Unknown"]
+    unknown = np.full((1, n_frames), CHORD_THRESHOLD)
+    log_emit = np.vstack([rank_chords(scores), unknown]) / temperature
+    n_states = log_emit.shape[0]
+
+    log_stay = np.log(self_transition)
+    log_move = np.log((1.0 - self_transition) / (n_states - 1))
+
+    delta = log_emit[:, 0].copy()
+    backpointers = np.empty((n_frames, n_states), dtype=np.int32)
+    states = np.arange(n_states, dtype=np.int32)
+    for t in range(1, n_frames):
+        best_prev = int(np.argmax(delta))
+        stay = delta + log_stay
+        move = delta[best_prev] + log_move
+        from_self = stay >= move
+        backpointers[t] = np.where(from_self, states, best_prev)
+        delta = np.where(from_self, stay, move) + log_emit[:, t]
+
+    path = np.empty(n_frames, dtype=np.int32)
+    path[-1] = int(np.argmax(delta))
+    for t in range(n_frames - 1, 0, -1):
+        path[t - 1] = backpointers[t, path[t]]
+    return [labels[i] for i in path]
+
+
+def chord_timeline(chroma_frames, sr, hop_length=512, **smoothing):
+    """Smoothed chord segments as [{"chord", "start", "end"}] in seconds"""
+    sequence = smooth_chord_sequence(chroma_frames, **smoothing)
+    timeline = []
+    for i, chord in enumerate(sequence):
+        if timeline and timeline[-1]["chord"] == chord:
+            timeline[-1]["end"] = (i + 1) * hop_length / sr
         else:
-            print(f"❌ Detected: {detected}, expected: {expected_chord}. Try again.\n")
-            attempts += 1
-    print("⛔ Max attempts reached. Moving on.")
+            timeline.append({"chord": chord, "start": i * hop_length / sr,
+                             "end": (i + 1) * hop_length / sr})
+    return timeline
+
+
+def listen_for_chord(expected_chord, source, timeout=20.0, min_duration=0.25,
+                     cancel_event=None, engine=None):
+    """Stream audio from `source` until `expected_chord` is recognized.
+
+    Chroma is updated every hop, and the decision is taken as soon as the
+    running chroma matches the expected chord with enough confidence, so a
+    cleanly played chord is confirmed in a fraction of a second. Returns
+    (matched, confidence, seconds_listened).
+    """
+    engine = engine or StreamingChromaEngine(source.sr)
+    min_frames = max(1, int(min_duration * source.sr / engine.hop_length))
+    max_samples = int(timeout * source.sr)
+    confidence = 0.0
+
+    while engine.samples_seen < max_samples:
+        if cancel_event is not None and cancel_event.is_set():
+            break
+        block = source.read()
+        if block is None:
+            break
+        if not engine.push(block) or engine.frames < min_frames:
+            continue
+
+        matched, confidence = matches_chord(engine.chroma(), expected_chord)
+        if matched:
+            return True, confidence, engine.samples_seen / source.sr
+
+    return False, confidence, engine.samples_seen / source.sr
+
+
+def wait_for_chord(expected_chord, max_attempts=10, cancel_event=None, source=None):
+    """Listen until `expected_chord` is heard, the time for `max_attempts` 2-second tries runs out or `cancel_event` is set"""
+    logger.info("🎯 Waiting until you play: %s", expected_chord)
+    own_source = source is None
+    if own_source:
+        source = DeviceSource()
+    try:
+        matched, confidence, elapsed = listen_for_chord(
+            expected_chord, source, timeout=2 * max_attempts, cancel_event=cancel_event
+        )
+    finally:
+        if own_source:
+            source.close()
+
+    if matched:
+        logger.info("✅ Correct! You played: %s (%.2f after %.2fs)", expected_chord, confidence, elapsed)
+        return True
+    if cancel_event is not None and cancel_event.is_set():
+        logger.info("⏹️ Listening cancelled.")
+        return False
+    logger.info("⛔ Max attempts reached. Moving on.")
     return False
 
 
 if __name__ == '__main__':
     # Example usage for manual test
+    logging.basicConfig(level=logging.INFO)
     expected_chord = "Am"
     wait_for_chord(expected_chord)
\ No newline at end of file
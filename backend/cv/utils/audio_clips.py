@@ -0,0 +1,97 @@
+import io
+import wave
+import numpy as np
+from utils.audio_stream import pcm_to_float
+
+# Decoding of short audio clips uploaded by clients. WAV and raw PCM are
+# handled here; compressed formats (WebM/Opus from MediaRecorder, Ogg, MP3,
+# M4A) need PyAV, which is imported only when such a clip arrives.
+
+WAV_TYPES = {"audio/wav", "audio/x-wav", "audio/wave", "audio/vnd.wave"}
+PCM_TYPES = {"audio/pcm", "audio/l16", "application/octet-stream"}
+PCM_FORMATS = {"s16le": 2, "s32le": 4, "f32le": 4}
+
+DECODE_SR = 22050
+
+
+class ClipError(ValueError):
+    """The uploaded clip can't be decoded; `status` is the HTTP code to answer with"""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def decode_wav(data):
+    try:
+        with wave.open(io.BytesIO(data), "rb") as wav:
+            sr = wav.getframerate()
+            raw = wav.readframes(wav.getnframes())
+            return pcm_to_float(raw, wav.getsampwidth(), wav.getnchannels()), sr
+    except (wave.Error, EOFError, ValueError) as e:
+        raise ClipError(f"Invalid WAV data: {e}")
+
+
+def pcm_layout(sr, channels=1, sample_format="s16le"):
+    """Validated (sr, channels) for raw PCM; values may come straight from a form or socket message"""
+    if sr is None or sr == "":
+        raise ClipError("Raw PCM needs a sample rate (sr)")
+    try:
+        sr, channels = int(sr), int(channels)
+    except (TypeError, ValueError):
+        raise ClipError("sr and channels must be integers")
+    if sr <= 0:
+        raise ClipError("sr must be positive")
+    if channels < 1:
+        raise ClipError("channels must be at least 1")
+    if sample_format not in PCM_FORMATS:
+        raise ClipError(f"Unsupported PCM format {sample_format!r}; expected one of {sorted(PCM_FORMATS)}")
+    return sr, channels
+
+
+def decode_pcm(data, sr, channels=1, sample_format="s16le"):
+    sr, channels = pcm_layout(sr, channels, sample_format)
+    frame_bytes = PCM_FORMATS[sample_format] * channels
+    data = data[:len(data) - len(data) % frame_bytes]
+    if sample_format == "f32le":
+        samples = np.frombuffer(data, dtype="<f4").astype(np.float32)
+        if channels > 1:
+            samples = samples.reshape(-1, channels).mean(axis=1)
+    else:
+        samples = pcm_to_float(data, PCM_FORMATS[sample_format], channels)
+    return samples, int(sr)
+
+
+def decode_compressed(data, sr=DECODE_SR):
+    """Decode any container/codec FFmpeg knows to mono float32 at `sr`"""
+    try:
+        import av
+    except ImportError:
+        raise ClipError("Compressed audio needs PyAV (pip install av); send WAV or raw PCM instead", 415)
+
+    try:
+        with av.open(io.BytesIO(data)) as container:
+            if not container.streams.audio:
+                raise ClipError("No audio stream in upload")
+            resampler = av.AudioResampler(format="flt", layout="mono", rate=sr)
+            chunks = []
+            for frame in container.decode(container.streams.audio[0]):
+                chunks.extend(f.to_ndarray().reshape(-1) for f in resampler.resample(frame))
+            chunks.extend(f.to_ndarray().reshape(-1) for f in resampler.resample(None))
+    except av.error.FFmpegError as e:
+        raise ClipError(f"Could not decode audio: {e}")
+    if not chunks:
+        return np.zeros(0, dtype=np.float32), sr
+    return np.concatenate(chunks).astype(np.float32), sr
+
+
+def decode_clip(data, content_type, sr=None, channels=1, sample_format="s16le"):
+    """Uploaded bytes -> (mono float32 samples, sample rate)"""
+    if not data:
+        raise ClipError("Empty audio upload")
+    content_type = (content_type or "").split(";")[0].strip().lower()
+    if content_type in WAV_TYPES or data[:4] == b"RIFF":
+        return decode_wav(data)
+    if content_type in PCM_TYPES:
+        return decode_pcm(data, sr, channels, sample_format)
+    return decode_compressed(data)
@@ -0,0 +1,190 @@
+import queue
+import wave
+import numpy as np
+from utils.chroma import chroma_filterbank, hann_window
+
+
+class ArraySource:
+    """Audio source over an in-memory signal, handed out in fixed-size blocks"""
+
+    def __init__(self, samples, sr, block_size=1024):
+        self.samples = np.asarray(samples, dtype=np.float32).reshape(-1)
+        self.sr = sr
+        self.block_size = block_size
+        self._pos = 0
+
+    def read(self):
+        if self._pos >= len(self.samples):
+            return None
+        block = self.samples[self._pos:self._pos + self.block_size]
+        self._pos += len(block)
+        return block
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class WavFileSource:
+    """Audio source reading a PCM WAV file block by block (downmixed to mono)"""
+
+    def __init__(self, path, block_size=1024):
+        self._wav = wave.open(str(path), "rb")
+        self.sr = self._wav.getframerate()
+        self.channels = self._wav.getnchannels()
+        self.sample_width = self._wav.getsampwidth()
+        self.block_size = block_size
+
+    def read(self):
+        raw = self._wav.readframes(self.block_size)
+        if not raw:
+            return None
+        return pcm_to_float(raw, self.sample_width, self.channels)
+
+    def close(self):
+        self._wav.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class DeviceSource:
+    """Live microphone source; blocks arrive from the sounddevice callback"""
+
+    def __init__(self, sr=22050, block_size=1024, device=None, read_timeout=1.0):
+        import sounddevice as sd
+
+        self.sr = sr
+        self.block_size = block_size
+        self.read_timeout = read_timeout
+        self._blocks = queue.Queue()
+        self._stream = sd.InputStream(samplerate=sr, blocksize=block_size, channels=1,
+                                      dtype="float32", device=device, callback=self._callback)
+        self._stream.start()
+
+    def _callback(self, indata, frames, time_info, status):
+        self._blocks.put(indata[:, 0].copy())
+
+    def read(self):
+        try:
+            return self._blocks.get(timeout=self.read_timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        self._stream.stop()
+        self._stream.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def pcm_to_float(raw, sample_width, channels=1):
+    """Interleaved integer PCM bytes -> mono float32 in [-1, 1]"""
+    if sample_width == 1:
+        samples = (np.frombuffer(raw, dtype=np.uint8).astype(np.float32) - 128.0) / 128.0
+    elif sample_width == 2:
+        samples = np.frombuffer(raw, dtype="<i2").astype(np.float32) / 32768.0
+    elif sample_width == 4:
+        samples = np.frombuffer(raw, dtype="<i4").astype(np.float32) / 2147483648.0
+    else:
+        raise ValueError(f"Unsupported sample width: {sample_width} bytes")
+
+    if channels > 1:
+        samples = samples.reshape(-1, channels).mean(axis=1)
+    return samples
+
+
+class StreamingChromaEngine:
+    """Incremental chroma over a ring buffer of the most recent `n_fft` samples.
+
+    Every `hop_length` new samples produce one chroma frame, which is folded
+    into an exponentially decaying running chroma, so a decision can be
+    taken after any hop instead of after a whole clip.
+    """
+
+    def __init__(self, sr, n_fft=2048, hop_length=512, decay=0.95):
+        if hop_length > n_fft:
+            raise ValueError("hop_length must not exceed n_fft")
+        self.sr = sr
+        self.n_fft = n_fft
+        self.hop_length = hop_length
+        self.decay = decay
+
+        self.window = hann_window(n_fft)
+        self.filterbank = chroma_filterbank(sr, n_fft)
+        self._buffer = np.zeros(n_fft, dtype=np.float32)
+        self.reset()
+
+    def reset(self):
+        self._buffer[:] = 0.0
+        self._pos = 0
+        self._filled = 0
+        self._since_hop = 0
+        self._running = np.zeros(12, dtype=np.float32)
+        self._weight = 0.0
+        self.frames = 0
+        self.samples_seen = 0
+
+    def push(self, samples):
+        """Feed new samples; returns the number of chroma frames produced"""
+        samples = np.asarray(samples, dtype=np.float32).reshape(-1)
+        self.samples_seen += len(samples)
+        produced = 0
+        i = 0
+        while i < len(samples):
+            take = min(self.hop_length - self._since_hop, len(samples) - i)
+            self._write(samples[i:i + take])
+            i += take
+            self._since_hop += take
+            self._filled = min(self.n_fft, self._filled + take)
+
+            if self._since_hop == self.hop_length:
+                self._since_hop = 0
+                if self._filled == self.n_fft:
+                    self._update(self._frame_chroma())
+                    produced += 1
+        return produced
+
+    def chroma(self):
+        """Running chroma normalized to a max of 1, or None before the first frame"""
+        if self._weight == 0.0:
+            return None
+        peak = self._running.max()
+        if peak <= 0:
+            return np.zeros(12, dtype=np.float32)
+        return self._running / peak
+
+    def _write(self, block):
+        end = self._pos + len(block)
+        if end <= self.n_fft:
+            self._buffer[self._pos:end] = block
+        else:
+            split = self.n_fft - self._pos
+            self._buffer[self._pos:] = block[:split]
+            self._buffer[:end - self.n_fft] = block[split:]
+        self._pos = end % self.n_fft
+
+    def _frame_chroma(self):
+        # Oldest sample first: the ring buffer starts at the write position
+        frame = np.concatenate((self._buffer[self._pos:], self._buffer[:self._pos]))
+        power = np.abs(np.fft.rfft(frame * self.window)) ** 2
+        chroma = self.filterbank @ power
+        peak = chroma.max()
+        return chroma / peak if peak > 0 else chroma
+
+    def _update(self, frame_chroma):
+        self._running = self.decay * self._running + frame_chroma
+        self._weight = self.decay * self._weight + 1.0
+        self.frames += 1
@@ -0,0 +1,189 @@
+import os
+import threading
+import time
+from collections import deque
+
+
+class BatchItem:
+    """One pending input plus the slot its result is handed back through"""
+
+    __slots__ = ("payload", "enqueued_at", "done", "result", "error")
+
+    def __init__(self, payload):
+        self.payload = payload
+        self.enqueued_at = time.perf_counter()
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class MicroBatcher:
+    """Collects inputs from many request threads and runs them in batches.
+
+    A single worker thread waits for the first pending item, then keeps
+    collecting until either `max_batch_size` items are queued or the oldest
+    one has waited `max_wait_ms`. The whole batch goes through
+    `process_batch(payloads)` in one call, which must return one result per
+    payload in the same order. `on_batch(size, waits, duration)` is called
+    after every batch, e.g. to feed metrics.
+
+    If a batch fails, its items are retried one at a time, so a single bad
+    input only fails its own caller instead of everyone it was batched with.
+
+    The worker is started on first use and restarted in a forked child, so
+    a batcher created before a pre-fork server forks works in every worker.
+    """
+
+    def __init__(self, process_batch, max_batch_size=8, max_wait_ms=10, name="batcher", on_batch=None):
+        self.process_batch = process_batch
+        self.on_batch = on_batch
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+        self.name = name
+
+        self._pid = os.getpid()
+        self._queue = deque()
+        self._cond = threading.Condition()
+        self._worker = None
+        self._stopped = False
+
+        self._stats_lock = threading.Lock()
+        self._batches = 0
+        self._items = 0
+        self._batch_size_counts = {}
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._process_total = 0.0
+        self._split_batches = 0
+
+    def start(self):
+        with self._cond:
+            if self._worker is not None and self._worker.is_alive():
+                return
+            self._stopped = False
+            self._worker = threading.Thread(target=self._run, name=self.name, daemon=True)
+            self._worker.start()
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+        if self._worker is not None:
+            self._worker.join(timeout=1.0)
+
+    def _reset_after_fork(self):
+        # The parent's worker thread and any lock it held don't exist in this process
+        self._pid = os.getpid()
+        self._queue = deque()
+        self._cond = threading.Condition()
+        self._worker = None
+        self._stopped = False
+        self._stats_lock = threading.Lock()
+
+    def submit(self, payload, timeout=None):
+        """Queue one input and block until its batch has been processed"""
+        if self._pid != os.getpid():
+            self._reset_after_fork()
+        if self._worker is None or not self._worker.is_alive():
+            self.start()
+
+        item = BatchItem(payload)
+        with self._cond:
+            self._queue.append(item)
+            self._cond.notify()
+
+        if not item.done.wait(timeout):
+            raise TimeoutError(f"{self.name}: no result within {timeout}s")
+        if item.error is not None:
+            raise item.error
+        return item.result
+
+    def queue_depth(self):
+        with self._cond:
+            return len(self._queue)
+
+    def _next_batch(self):
+        with self._cond:
+            while not self._queue and not self._stopped:
+                self._cond.wait()
+            if self._stopped:
+                return []
+
+            deadline = self._queue[0].enqueued_at + self.max_wait
+            while len(self._queue) < self.max_batch_size and not self._stopped:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+
+            count = min(len(self._queue), self.max_batch_size)
+            return [self._queue.popleft() for _ in range(count)]
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            if not batch:
+                if self._stopped:
+                    return
+                continue
+
+            started = time.perf_counter()
+            try:
+                self._process(batch)
+            except Exception as e:
+                if len(batch) == 1:
+                    batch[0].error = e
+                else:
+                    with self._stats_lock:
+                        self._split_batches += 1
+                    for item in batch:
+                        try:
+                            self._process([item])
+                        except Exception as item_error:
+                            item.error = item_error
+            finished = time.perf_counter()
+
+            self._record(batch, started, finished)
+            for item in batch:
+                item.done.set()
+
+    def _process(self, batch):
+        results = self.process_batch([item.payload for item in batch])
+        if len(results) != len(batch):
+            raise RuntimeError(
+                f"{self.name}: got {len(results)} results for a batch of {len(batch)}"
+            )
+        for item, result in zip(batch, results):
+            item.result = result
+
+    def _record(self, batch, started, finished):
+        waits = [started - item.enqueued_at for item in batch]
+        with self._stats_lock:
+            self._batches += 1
+            self._items += len(batch)
+            size = len(batch)
+            self._batch_size_counts[size] = self._batch_size_counts.get(size, 0) + 1
+            self._wait_total += sum(waits)
+            self._wait_max = max(self._wait_max, max(waits))
+            self._process_total += finished - started
+        if self.on_batch is not None:
+            self.on_batch(len(batch), waits, finished - started)
+
+    def stats(self):
+        """Batch size distribution and queue wait times since startup"""
+        with self._stats_lock:
+            batches = self._batches
+            items = self._items
+            return {
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": self.max_wait * 1000.0,
+                "queue_depth": self.queue_depth(),
+                "batches": batches,
+                "items": items,
+                "split_batches": self._split_batches,
+                "avg_batch_size": items / batches if batches else 0.0,
+                "batch_sizes": {str(k): v for k, v in sorted(self._batch_size_counts.items())},
+                "avg_queue_wait_ms": 1000.0 * self._wait_total / items if items else 0.0,
+                "max_queue_wait_ms": 1000.0 * self._wait_max,
+                "avg_batch_time_ms": 1000.0 * self._process_total / batches if batches else 0.0,
+            }
@@ -0,0 +1,210 @@
+import argparse
+import glob
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import numpy as np
+import cv2
+
+# Benchmarks for the per-frame and audio hot paths:
+#   python -m utils.benchmark --out bench.json                   # run and save
+#   python -m utils.benchmark --baseline bench.json              # compare, exit 1 on regression
+#   python -m utils.benchmark --filter chroma --repeat 50
+# main.py is imported with the deterministic stub detector (CV_MODEL_BACKEND=stub)
+# unless another backend is set explicitly, so no weights or camera are needed
+# and model cost is excluded - the numbers cover our own code around the model.
+# The batcher's collection window is off by default as well: with a single
+# caller it would only add a constant max-wait to every frame timing.
+
+FRAME_SIZES = [(320, 240), (640, 480), (1280, 720)]
+AUDIO_SECONDS = [0.5, 2.0, 10.0]
+CLIP_BATCHES = [1, 8, 32]
+SR = 22050
+
+# Root frequencies (Hz) low enough to sit in the chroma filterbank's sweet spot
+NOTE_HZ = {name: 110.0 * 2 ** ((i - 9) / 12) for i, name in enumerate(
+    ['C', 'C#', 'D', 'D#', 'E', 'F', 'F#', 'G', 'G#', 'A', 'A#', 'B'])}
+
+
+def synthetic_frame(width, height, seed=0):
+    """Deterministic textured BGR frame that JPEG-compresses like a camera image"""
+    rng = np.random.default_rng(seed)
+    x = np.linspace(0, 255, width, dtype=np.float32)
+    y = np.linspace(0, 255, height, dtype=np.float32)[:, None]
+    frame = np.stack([x + 0 * y, y + 0 * x, (x + y) / 2], axis=2)
+    frame += rng.normal(0, 12, frame.shape).astype(np.float32)
+    frame = np.clip(frame, 0, 255).astype(np.uint8)
+    cv2.rectangle(frame, (width // 10, int(height * 0.4)), (width * 9 // 10, int(height * 0.6)), (40, 70, 110), -1)
+    return frame
+
+
+def load_frames(frames_dir, width, height):
+    """Recorded fixtures resized to one benchmark size, or None if there are none"""
+    paths = sorted(glob.glob(os.path.join(frames_dir, "*.jpg")) + glob.glob(os.path.join(frames_dir, "*.png")))
+    frames = [cv2.imread(p) for p in paths]
+    frames = [cv2.resize(f, (width, height)) for f in frames if f is not None]
+    return frames or None
+
+
+def synth_chord(chord, seconds, sr=SR, seed=0):
+    """A few harmonics of each chord tone plus a little noise"""
+    from utils.audio_chord_detector import CHORDS, NOTE_NAMES
+
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * sr)) / sr
+    y = np.zeros_like(t)
+    for pitch_class in CHORDS[chord]:
+        f0 = NOTE_HZ[NOTE_NAMES[pitch_class]] * 2
+        for harmonic, gain in ((1, 1.0), (2, 0.5), (3, 0.25)):
+            y += gain * np.sin(2 * np.pi * f0 * harmonic * t)
+    y /= np.abs(y).max() or 1.0
+    return (0.5 * y + 0.01 * rng.standard_normal(len(t))).astype(np.float32)
+
+
+def time_call(fn, repeat, warmup):
+    for _ in range(warmup):
+        fn()
+    times = np.empty(repeat)
+    for i in range(repeat):
+        started = time.perf_counter()
+        fn()
+        times[i] = time.perf_counter() - started
+    times *= 1000.0
+    return {
+        "runs": repeat,
+        "median_ms": float(np.median(times)),
+        "p90_ms": float(np.percentile(times, 90)),
+        "mean_ms": float(times.mean()),
+        "min_ms": float(times.min()),
+    }
+
+
+def benchmark_cases(frames_dir=None):
+    """[(name, fn)] for every benchmark; fixtures are built up front, outside the timings"""
+    import main
+    from utils.audio_chord_detector import detect_chord, extract_chroma, score_clips
+
+    cases = []
+    chord = "Am"
+    for width, height in FRAME_SIZES:
+        size = f"{width}x{height}"
+        frames = (load_frames(frames_dir, width, height) if frames_dir else None) or \
+            [synthetic_frame(width, height, seed) for seed in range(8)]
+        jpegs = [cv2.imencode(".jpg", f, [cv2.IMWRITE_JPEG_QUALITY, 80])[1].tobytes() for f in frames]
+        fret_boxes = main.extract_fret_boxes(main.get_detector().detect([frames[0]])[0])
+
+        cases.append((f"decode_frame/{size}", lambda j=jpegs[0]: main.decode_frame(j)))
+        cases.append((f"generate_chord_overlay/{size}",
+                      lambda b=fret_boxes: main.generate_chord_overlay(chord, b)))
+        cases.append((f"process_frame_with_yolo/full/{size}",
+                      lambda f=frames[0]: main.process_frame_with_yolo(f, chord)))
+
+        # Session path: tracker, ROI and frame reuse all in play, frames cycling
+        session_id = f"bench-{size}"
+        main.create_session(session_id)
+        cases.append((f"process_frame_with_yolo/session/{size}",
+                      lambda f=frames, s=session_id, n=iter(range(10 ** 9)): main.process_frame_with_yolo(
+                          f[next(n) % len(f)], chord, s)))
+
+    for seconds in AUDIO_SECONDS:
+        audio = synth_chord(chord, seconds)
+        chroma = extract_chroma(audio, SR)
+        cases.append((f"extract_chroma/{seconds:g}s", lambda a=audio: extract_chroma(a, SR)))
+        cases.append((f"detect_chord/{seconds:g}s", lambda c=chroma: detect_chord(c)))
+
+    names = ["Am", "C", "G", "D", "Em", "E", "A", "D7"]
+    for count in CLIP_BATCHES:
+        clips = [(synth_chord(names[i % len(names)], 2.0, seed=i), SR) for i in range(count)]
+        cases.append((f"score_clips/{count}x2s", lambda c=clips: score_clips(c)))
+    return cases
+
+
+def environment():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                                text=True, timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "commit": commit,
+        "python": sys.version.split()[0],
+        "numpy": np.__version__,
+        "opencv": cv2.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "model_backend": os.environ.get("CV_MODEL_BACKEND"),
+    }
+
+
+def run(repeat=30, warmup=5, name_filter=None, frames_dir=None):
+    results = {}
+    for name, fn in benchmark_cases(frames_dir):
+        if name_filter and name_filter not in name:
+            continue
+        results[name] = time_call(fn, repeat, warmup)
+        print(f"{name:48s} {results[name]['median_ms']:9.3f} ms (p90 {results[name]['p90_ms']:.3f})",
+              file=sys.stderr)
+    return {"environment": environment(), "results": results}
+
+
+def compare(current, baseline, tolerance=0.20, min_delta_ms=0.05):
+    """Rows of (name, baseline_ms, current_ms, ratio, status) on median time.
+
+    A change counts only if it exceeds both the relative `tolerance` and
+    `min_delta_ms`, so scheduler jitter on sub-millisecond cases isn't
+    reported as a regression.
+    """
+    rows = []
+    for name, result in current["results"].items():
+        before = baseline.get("results", {}).get(name)
+        if before is None:
+            rows.append((name, None, result["median_ms"], None, "new"))
+            continue
+        ratio = result["median_ms"] / before["median_ms"] if before["median_ms"] else float("inf")
+        delta = result["median_ms"] - before["median_ms"]
+        if abs(delta) < min_delta_ms:
+            status = "same"
+        else:
+            status = "slower" if ratio > 1 + tolerance else "faster" if ratio < 1 - tolerance else "same"
+        rows.append((name, before["median_ms"], result["median_ms"], ratio, status))
+    return rows
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark the CV and audio hot paths")
+    parser.add_argument("--out", help="write results JSON here")
+    parser.add_argument("--baseline", help="results JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.20, help="relative median change treated as noise")
+    parser.add_argument("--min-delta-ms", type=float, default=0.05, help="absolute median change treated as noise")
+    parser.add_argument("--repeat", type=int, default=30)
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--filter", help="only run benchmarks whose name contains this")
+    parser.add_argument("--frames", help="directory of recorded .jpg/.png frames to use instead of synthetic ones")
+    args = parser.parse_args()
+
+    os.environ.setdefault("CV_MODEL_BACKEND", "stub")
+    os.environ.setdefault("CV_LOG_LEVEL", "WARNING")
+    os.environ.setdefault("CV_MAX_BATCH_WAIT_MS", "0")
+    results = run(args.repeat, args.warmup, args.filter, args.frames)
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        rows = compare(results, baseline, args.tolerance, args.min_delta_ms)
+        print(f"{'benchmark':48s} {'baseline':>10s} {'current':>10s} {'ratio':>7s}")
+        for name, before, after, ratio, status in rows:
+            before_text = f"{before:10.3f}" if before is not None else f"{'-':>10s}"
+            ratio_text = f"{ratio:7.2f}" if ratio is not None else f"{'-':>7s}"
+            print(f"{name:48s} {before_text} {after:10.3f} {ratio_text}  {status}")
+        if any(status == "slower" for *_, status in rows):
+            sys.exit(1)
+    elif not args.out:
+        print(json.dumps(results, indent=2))
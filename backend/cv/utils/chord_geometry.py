@@ -0,0 +1,107 @@
+import json
+import logging
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+NUM_STRINGS = 6
+MAX_FRET = 12
+
+
+def fret_box_array(fret_boxes):
+    """{fret: (x1, y1, x2, y2)} -> (MAX_FRET + 1, 4) float array indexed by fret, plus a valid mask"""
+    boxes = np.zeros((MAX_FRET + 1, 4), dtype=np.float64)
+    valid = np.zeros(MAX_FRET + 1, dtype=bool)
+    for fret, box in fret_boxes.items():
+        if 1 <= fret <= MAX_FRET:
+            boxes[fret] = box
+            valid[fret] = True
+    # A box with no width can't be split into strings
+    valid &= boxes[:, 2] > boxes[:, 0]
+    return boxes, valid
+
+
+class ChordTable:
+    """Chord shapes compiled into flat NumPy arrays, one contiguous slice per chord.
+
+    Positions are validated once here (string 1-6, fret 1-12, no duplicate
+    fret/string pairs), so per-frame overlay code never re-checks them.
+    """
+
+    def __init__(self, chords):
+        self.names = []
+        self.index = {}
+        offsets = [0]
+        frets = []
+        strings = []
+
+        for name, positions in chords.items():
+            seen = set()
+            for pos in positions or []:
+                if len(pos) < 2:
+                    logger.warning("⚠️ %s: ignoring malformed position %s", name, pos)
+                    continue
+                fret, string = int(pos[0]), int(pos[1])
+                if not (1 <= string <= NUM_STRINGS) or not (1 <= fret <= MAX_FRET):
+                    logger.warning("⚠️ %s: ignoring out-of-range position (fret %s, string %s)", name, fret, string)
+                    continue
+                if (fret, string) in seen:
+                    logger.warning("⚠️ %s: ignoring duplicate position (fret %s, string %s)", name, fret, string)
+                    continue
+                seen.add((fret, string))
+                frets.append(fret)
+                strings.append(string)
+
+            self.index[name] = len(self.names)
+            self.names.append(name)
+            offsets.append(len(frets))
+
+        self.offsets = np.array(offsets, dtype=np.int32)
+        self.frets = np.array(frets, dtype=np.int16)
+        self.strings = np.array(strings, dtype=np.int16)
+        # Column across the fret box: string 6 sits at x1, string 1 at x2 (reversed direction)
+        self.columns = (NUM_STRINGS - self.strings).astype(np.float64)
+
+    @classmethod
+    def from_json(cls, path):
+        """Compile chords.json ({"Am": [[fret, string], ...], ...})"""
+        with open(path) as f:
+            return cls(json.load(f))
+
+    def __contains__(self, chord_name):
+        return chord_name in self.index
+
+    def __len__(self):
+        return len(self.names)
+
+    def _slice(self, chord_name):
+        i = self.index.get(chord_name)
+        if i is None:
+            return slice(0, 0)
+        return slice(self.offsets[i], self.offsets[i + 1])
+
+    def positions(self, chord_name):
+        """[(fret, string), ...] for a chord, empty if unknown"""
+        part = self._slice(chord_name)
+        return list(zip(self.frets[part].tolist(), self.strings[part].tolist()))
+
+    def overlay_points(self, chord_name, fret_boxes):
+        """Dot positions for every chord position whose fret box is present.
+
+        Returns (frets, strings, xs, ys) arrays, computed with one gather over
+        the frame's fret boxes.
+        """
+        boxes, valid = fret_box_array(fret_boxes)
+        part = self._slice(chord_name)
+        frets = self.frets[part]
+        present = valid[frets]
+        frets = frets[present]
+
+        chosen = boxes[frets]
+        spacing = (chosen[:, 2] - chosen[:, 0]) / (NUM_STRINGS - 1)
+        xs = (chosen[:, 0] + self.columns[part][present] * spacing).astype(np.int32)
+        ys = ((chosen[:, 1] + chosen[:, 3]) / 2).astype(np.int32)
+        return frets, self.strings[part][present], xs, ys
+
+    def to_dict(self):
+        return {name: self.positions(name) for name in self.names}
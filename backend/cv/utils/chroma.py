@@ -0,0 +1,72 @@
+from functools import lru_cache
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# Self-contained chroma features. The filterbank mirrors
+# librosa.filters.chroma (ctroct=5, octwidth=2, base_c=True), so results
+# match librosa.feature.chroma_stft computed with tuning=0.
+
+
+@lru_cache(maxsize=16)
+def chroma_filterbank(sr, n_fft, n_chroma=12, tuning=0.0, ctroct=5.0, octwidth=2.0):
+    """(n_chroma, 1 + n_fft // 2) matrix mapping STFT power bins to pitch classes"""
+    frequencies = np.linspace(0, sr, n_fft, endpoint=False)[1:]
+    a440 = 440.0 * 2.0 ** (tuning / n_chroma)
+    frqbins = n_chroma * np.log2(frequencies / (a440 / 16))
+
+    # The 0 Hz bin gets a made-up position 1.5 octaves below bin 1
+    frqbins = np.concatenate(([frqbins[0] - 1.5 * n_chroma], frqbins))
+    binwidthbins = np.concatenate((np.maximum(frqbins[1:] - frqbins[:-1], 1.0), [1.0]))
+
+    distance = np.subtract.outer(frqbins, np.arange(n_chroma, dtype=float)).T
+    half = np.round(n_chroma / 2.0)
+    distance = np.remainder(distance + half + 10 * n_chroma, n_chroma) - half
+
+    weights = np.exp(-0.5 * (2 * distance / binwidthbins) ** 2)
+    column_norms = np.linalg.norm(weights, axis=0)
+    weights /= np.where(column_norms > np.finfo(float).tiny, column_norms, 1.0)
+
+    if octwidth:
+        weights *= np.exp(-0.5 * ((frqbins / n_chroma - ctroct) / octwidth) ** 2)
+
+    # Start the pitch classes at C instead of A
+    weights = np.roll(weights, -3 * (n_chroma // 12), axis=0)
+    fb = np.ascontiguousarray(weights[:, :1 + n_fft // 2], dtype=np.float32)
+    fb.flags.writeable = False
+    return fb
+
+
+@lru_cache(maxsize=16)
+def hann_window(n_fft):
+    """Periodic Hann window, as used for STFT analysis"""
+    window = np.hanning(n_fft + 1)[:-1].astype(np.float32)
+    window.flags.writeable = False
+    return window
+
+
+def frame_signal(y, n_fft=2048, hop_length=512, center=True):
+    """(n_frames, n_fft) strided view over `y`; no samples are copied unless centering pads"""
+    y = np.asarray(y, dtype=np.float32).reshape(-1)
+    if center:
+        y = np.pad(y, n_fft // 2)
+    if len(y) < n_fft:
+        return np.empty((0, n_fft), dtype=np.float32)
+    return sliding_window_view(y, n_fft)[::hop_length]
+
+
+def power_spectrogram(frames, n_fft):
+    """|rfft|^2 of Hann-windowed frames, shape (1 + n_fft // 2, n_frames)"""
+    spectrum = np.fft.rfft(frames * hann_window(n_fft), axis=1)
+    power = spectrum.real ** 2 + spectrum.imag ** 2
+    return power.T.astype(np.float32)
+
+
+def chroma_stft(y, sr, n_fft=2048, hop_length=512, center=True):
+    """(12, n_frames) chroma, each frame scaled so its strongest pitch class is 1"""
+    frames = frame_signal(y, n_fft, hop_length, center)
+    if len(frames) == 0:
+        return np.zeros((12, 0), dtype=np.float32)
+
+    chroma = chroma_filterbank(sr, n_fft) @ power_spectrogram(frames, n_fft)
+    peaks = chroma.max(axis=0)
+    return chroma / np.where(peaks > np.finfo(np.float32).tiny, peaks, 1.0)
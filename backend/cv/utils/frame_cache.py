@@ -0,0 +1,69 @@
+import threading
+import time
+from collections import namedtuple
+import cv2
+import numpy as np
+
+
+def frame_signature(frame, size=32):
+    """Tiny grayscale thumbnail used to tell whether two frames differ"""
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+    return cv2.resize(gray, (size, size), interpolation=cv2.INTER_AREA).astype(np.int16)
+
+
+# Thumbnails hide the resolution, so the frame size is part of the key:
+# boxes found at one size are meaningless for a resized copy of the picture.
+FrameKey = namedtuple("FrameKey", ["shape", "thumbnail"])
+
+
+def signature_distance(a, b):
+    """Mean absolute difference in gray levels (0-255)"""
+    return float(np.abs(a - b).mean())
+
+
+class FrameCache:
+    """Reuses one session's last fret boxes while the camera image stays still.
+
+    New frames are compared against the frame inference last ran on (not
+    the previous reused one), so slow drift can't accumulate unnoticed.
+    Results are reused only while the mean thumbnail difference stays at or
+    below `threshold` and the cached result is younger than `max_age` seconds.
+    """
+
+    def __init__(self, threshold=3.0, max_age=0.5, size=32):
+        self.threshold = threshold
+        self.max_age = max_age
+        self.size = size
+        self.lock = threading.Lock()
+        self._signature = None
+        self._fret_boxes = None
+        self._stored_at = 0.0
+        self.hits = 0
+        self.misses = 0
+
+    def signature(self, frame):
+        """Lookup key for `frame`: its size plus its thumbnail"""
+        return FrameKey(frame.shape[:2], frame_signature(frame, self.size))
+
+    def lookup(self, signature):
+        """Cached fret boxes if `signature` matches the anchor frame, else None"""
+        with self.lock:
+            if (self._signature is None
+                    or self._signature.shape != signature.shape
+                    or time.monotonic() - self._stored_at > self.max_age
+                    or signature_distance(self._signature.thumbnail, signature.thumbnail) > self.threshold):
+                self.misses += 1
+                return None
+            self.hits += 1
+            return self._fret_boxes
+
+    def store(self, signature, fret_boxes):
+        with self.lock:
+            self._signature = signature
+            self._fret_boxes = fret_boxes
+            self._stored_at = time.monotonic()
+
+    def reset(self):
+        with self.lock:
+            self._signature = None
+            self._fret_boxes = None
@@ -0,0 +1,95 @@
+import threading
+import numpy as np
+from utils.chord_geometry import MAX_FRET
+
+# Fret n's wire sits at L * (1 - 2^(-n/12)) from the nut, so under an affine
+# camera every box coordinate is alpha + beta * 2^(-n/12) for some per-session
+# alpha, beta. One (MAX_FRET, 2) basis matrix therefore predicts all fret
+# boxes from a (2, 4) coefficient matrix in a single product.
+FRETS = np.arange(1, MAX_FRET + 1)
+BASIS = np.stack([np.ones(MAX_FRET), 2.0 ** (-FRETS / 12.0)], axis=1)
+
+
+class FretboardModel:
+    """Per-session fit of the fret spacing law to detected Zone boxes.
+
+    Detections are folded into exponentially forgotten least-squares sums,
+    so a few frames of partial detections still pin down the whole neck,
+    and the fit is restarted when the detections jump away from it (the
+    guitar moved) or the frame size changes. `complete()` fills undetected
+    frets from the fit and pulls detected ones `snap` of the way towards it
+    to damp jitter.
+    """
+
+    def __init__(self, forgetting=0.7, min_frets=3, snap=0.3, move_tolerance=0.5):
+        self.forgetting = forgetting
+        self.min_frets = min_frets
+        self.snap = snap
+        self.move_tolerance = move_tolerance
+        self.lock = threading.Lock()
+        self.resets = 0
+        self.frame_shape = None
+        self.reset()
+
+    def reset(self):
+        self._gram = np.zeros((2, 2))
+        self._moments = np.zeros((2, 4))
+        self._support = np.zeros(MAX_FRET)
+        self.coefficients = None
+
+    def update(self, fret_boxes):
+        """Fold one frame's {fret: box} into the fit"""
+        frets = np.array([f for f in fret_boxes if 1 <= f <= MAX_FRET], dtype=int)
+        if len(frets) == 0:
+            return
+        boxes = np.array([fret_boxes[f] for f in frets], dtype=np.float64)
+        rows = BASIS[frets - 1]
+
+        if self.coefficients is not None:
+            error = np.median(np.abs(rows @ self.coefficients - boxes))
+            scale = np.median(np.maximum(boxes[:, 2] - boxes[:, 0], boxes[:, 3] - boxes[:, 1]))
+            if error > self.move_tolerance * max(scale, 1.0):
+                self.reset()
+                self.resets += 1
+
+        self._gram = self.forgetting * self._gram + rows.T @ rows
+        self._moments = self.forgetting * self._moments + rows.T @ boxes
+        self._support *= self.forgetting
+        self._support[frets - 1] += 1.0
+
+        if np.count_nonzero(self._support > 0.5) >= self.min_frets and np.linalg.cond(self._gram) < 1e10:
+            self.coefficients = np.linalg.solve(self._gram, self._moments)
+
+    def predict(self):
+        """(MAX_FRET, 4) predicted boxes for frets 1..MAX_FRET, or None before the fit is usable"""
+        if self.coefficients is None:
+            return None
+        return BASIS @ self.coefficients
+
+    def complete(self, fret_boxes, frame_shape=None):
+        """Update with this frame's boxes and return boxes for every fret the fit can place"""
+        with self.lock:
+            if frame_shape is not None:
+                if self.frame_shape is not None and self.frame_shape != frame_shape[:2]:
+                    # The fit is in the old resolution's pixels
+                    self.reset()
+                    self.resets += 1
+                self.frame_shape = frame_shape[:2]
+            self.update(fret_boxes)
+            predicted = self.predict()
+        if predicted is None:
+            return fret_boxes
+
+        detected = np.zeros(MAX_FRET, dtype=bool)
+        measured = predicted.copy()
+        for fret, box in fret_boxes.items():
+            if 1 <= fret <= MAX_FRET:
+                detected[fret - 1] = True
+                measured[fret - 1] = box
+        blended = np.where(detected[:, None], (1.0 - self.snap) * measured + self.snap * predicted, predicted)
+        usable = (blended[:, 2] > blended[:, 0]) & (blended[:, 3] > blended[:, 1])
+
+        completed = dict(fret_boxes)
+        for i in np.flatnonzero(usable | detected).tolist():
+            completed[i + 1] = blended[i].astype(int) if usable[i] else fret_boxes[i + 1]
+        return completed
@@ -0,0 +1,162 @@
+import argparse
+import os
+import time
+from collections import namedtuple
+import numpy as np
+
+# Where each backend's weights live. Exported models come from
+# `python -m utils.inference <backend>` (see export_model below).
+DETECTOR_BACKENDS = {
+    "pytorch": "assets/models/best.pt",
+    "onnx": "assets/models/best.onnx",
+    "openvino": "assets/models/best_openvino_model",
+    "openvino-int8": "assets/models/best_int8_openvino_model",
+}
+
+# Deterministic fake detector for benchmarks and load tests - needs no weights
+STUB_BACKEND = "stub"
+
+DEFAULT_BACKEND = "pytorch"
+DEFAULT_IMGSZ = 640
+
+# One detected box: class label, confidence and [x1, y1, x2, y2] in frame pixels
+Detection = namedtuple("Detection", ["label", "conf", "bbox"])
+
+
+def result_detections(result):
+    """Flatten one ultralytics result into a list of Detection"""
+    if result.boxes is None or len(result.boxes) == 0:
+        return []
+    classes = result.boxes.cls.cpu().numpy().astype(int)
+    confs = result.boxes.conf.cpu().numpy()
+    boxes = result.boxes.xyxy.cpu().numpy()
+    return [Detection(result.names[c], float(conf), bbox)
+            for c, conf, bbox in zip(classes, confs, boxes)]
+
+
+class YoloDetector:
+    """YOLO fret-zone detector over any ultralytics-loadable backend.
+
+    PyTorch weights accept any inference size; exported ONNX/OpenVINO models
+    are run at the fixed size they were exported with. Models exported
+    without a dynamic batch axis need `max_batch=1` (CV_MODEL_MAX_BATCH);
+    larger batches are then split into several model calls.
+    """
+
+    def __init__(self, path, backend=DEFAULT_BACKEND, imgsz=DEFAULT_IMGSZ, max_batch=None):
+        self.path = path
+        self.backend = backend
+        self.imgsz = imgsz
+        self.max_batch = max_batch or None
+        self.fixed_imgsz = backend != "pytorch"
+        from ultralytics import YOLO
+        self.model = YOLO(path, task="detect")
+        self.names = self.model.names
+
+    def detect(self, frames, imgsz=None):
+        """One list of Detection per frame, from a single batched model call"""
+        if not frames:
+            return []
+        if imgsz is None or self.fixed_imgsz:
+            imgsz = self.imgsz
+        frames = list(frames)
+        step = self.max_batch or len(frames)
+        detections = []
+        for i in range(0, len(frames), step):
+            results = self.model(frames[i:i + step], imgsz=imgsz, verbose=False)
+            detections.extend(result_detections(r) for r in results)
+        return detections
+
+    def warm_up(self, runs=2):
+        """Run blank frames through the model so the first request doesn't pay for lazy init"""
+        frame = np.zeros((self.imgsz, self.imgsz, 3), dtype=np.uint8)
+        for _ in range(runs):
+            self.detect([frame])
+
+
+class StubDetector:
+    """Stands in for YoloDetector without loading a model.
+
+    Every frame gets the same 12 Zone boxes laid out across the middle of
+    the image, so results are deterministic and scale with the frame size.
+    `latency_ms` per call and `frame_latency_ms` per frame simulate model
+    cost (CV_STUB_LATENCY_MS / CV_STUB_FRAME_LATENCY_MS).
+    """
+
+    def __init__(self, imgsz=DEFAULT_IMGSZ, latency_ms=0.0, frame_latency_ms=0.0, zones=12):
+        self.path = None
+        self.backend = STUB_BACKEND
+        self.imgsz = imgsz
+        self.fixed_imgsz = False
+        self.latency = latency_ms / 1000.0
+        self.frame_latency = frame_latency_ms / 1000.0
+        self.names = {i: f"Zone{i + 1}" for i in range(zones)}
+
+    def frame_detections(self, height, width):
+        zones = len(self.names)
+        x0, span = 0.1 * width, 0.8 * width / zones
+        y1, y2 = 0.4 * height, 0.6 * height
+        return [
+            Detection(self.names[i], 0.9, np.array([x0 + i * span, y1, x0 + (i + 1) * span, y2], dtype=np.float32))
+            for i in range(zones)
+        ]
+
+    def detect(self, frames, imgsz=None):
+        if not frames:
+            return []
+        delay = self.latency + self.frame_latency * len(frames)
+        if delay:
+            time.sleep(delay)
+        return [self.frame_detections(*frame.shape[:2]) for frame in frames]
+
+    def warm_up(self, runs=2):
+        pass
+
+
+def load_detector(backend=None, path=None, imgsz=None, warm_up=True):
+    """Load the detector chosen by arguments or CV_MODEL_BACKEND / CV_MODEL_PATH / CV_IMGSZ"""
+    backend = backend or os.environ.get("CV_MODEL_BACKEND", DEFAULT_BACKEND)
+    imgsz = int(imgsz or os.environ.get("CV_IMGSZ", DEFAULT_IMGSZ))
+    if backend == STUB_BACKEND:
+        return StubDetector(imgsz,
+                            latency_ms=float(os.environ.get("CV_STUB_LATENCY_MS", "0")),
+                            frame_latency_ms=float(os.environ.get("CV_STUB_FRAME_LATENCY_MS", "0")))
+    if backend not in DETECTOR_BACKENDS:
+        raise ValueError(f"Unknown model backend {backend!r}; expected one of "
+                         f"{sorted(DETECTOR_BACKENDS) + [STUB_BACKEND]}")
+    path = path or os.environ.get("CV_MODEL_PATH") or DETECTOR_BACKENDS[backend]
+
+    max_batch = int(os.environ.get("CV_MODEL_MAX_BATCH", "0"))
+    detector = YoloDetector(path, backend=backend, imgsz=imgsz, max_batch=max_batch)
+    if warm_up:
+        detector.warm_up()
+    return detector
+
+
+def export_model(backend, source=DETECTOR_BACKENDS["pytorch"], imgsz=DEFAULT_IMGSZ, data=None):
+    """Export the PyTorch weights for a CPU backend; INT8 needs a calibration dataset yaml"""
+    if backend == "onnx":
+        kwargs = {"format": "onnx", "dynamic": True, "simplify": True}
+    elif backend == "openvino":
+        kwargs = {"format": "openvino", "dynamic": True}
+    elif backend == "openvino-int8":
+        if data is None:
+            raise ValueError("INT8 export needs --data pointing at the training dataset yaml")
+        kwargs = {"format": "openvino", "dynamic": True, "int8": True, "data": data}
+    else:
+        raise ValueError(f"Nothing to export for backend {backend!r}")
+
+    from ultralytics import YOLO
+    return YOLO(source).export(imgsz=imgsz, **kwargs)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Export the fret-zone model for CPU inference")
+    parser.add_argument("backend", choices=["onnx", "openvino", "openvino-int8"])
+    parser.add_argument("--source", default=DETECTOR_BACKENDS["pytorch"])
+    parser.add_argument("--imgsz", type=int, default=DEFAULT_IMGSZ)
+    parser.add_argument("--data", help="dataset yaml used for INT8 calibration")
+    args = parser.parse_args()
+
+    exported = export_model(args.backend, args.source, args.imgsz, args.data)
+    print(f"✅ Exported {args.backend} model to {exported}")
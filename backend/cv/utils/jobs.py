@@ -0,0 +1,138 @@
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+CANCELLED = "cancelled"
+FAILED = "failed"
+
+FINISHED_STATES = (DONE, CANCELLED, FAILED)
+
+
+class Job:
+    __slots__ = ("job_id", "owner", "status", "result", "error",
+                 "cancel_event", "created_at", "finished_at", "future", "on_finish")
+
+    def __init__(self, owner):
+        self.job_id = uuid.uuid4().hex
+        self.owner = owner
+        self.status = QUEUED
+        self.result = None
+        self.error = None
+        self.cancel_event = threading.Event()
+        self.created_at = time.time()
+        self.finished_at = None
+        self.future = None
+        self.on_finish = None
+
+    def to_dict(self):
+        return {
+            "job_id": self.job_id,
+            "status": self.status,
+            "result": self.result,
+            "error": self.error,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class JobPool:
+    """Background jobs on a fixed worker pool, looked up by id and cancellable.
+
+    `fn(cancel_event)` runs on a worker thread and should return early once
+    `cancel_event` is set. `on_finish(job)` is called once the job reaches a
+    final state, which is where results get pushed to clients: on the worker,
+    or on the cancelling thread for a job cancelled before it started.
+    Finished jobs are kept for `retention` seconds so clients can poll them.
+    """
+
+    def __init__(self, max_workers=4, retention=300, name="jobs"):
+        self.retention = retention
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def submit(self, owner, fn, on_finish=None):
+        job = Job(owner)
+        job.on_finish = on_finish
+        with self._lock:
+            self._prune()
+            self._jobs[job.job_id] = job
+        job.future = self._executor.submit(self._run, job, fn)
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def active_for(self, owner):
+        """The owner's queued or running job, if any"""
+        with self._lock:
+            for job in self._jobs.values():
+                if job.owner == owner and job.status not in FINISHED_STATES:
+                    return job
+        return None
+
+    def cancel(self, job_id):
+        job = self.get(job_id)
+        if job is None:
+            return None
+        self._cancel(job)
+        return job
+
+    def cancel_owner(self, owner):
+        """Cancel every unfinished job belonging to `owner`"""
+        with self._lock:
+            jobs = [j for j in self._jobs.values()
+                    if j.owner == owner and j.status not in FINISHED_STATES]
+        for job in jobs:
+            self._cancel(job)
+        return len(jobs)
+
+    def counts(self):
+        with self._lock:
+            counts = {}
+            for job in self._jobs.values():
+                counts[job.status] = counts.get(job.status, 0) + 1
+            return counts
+
+    def _cancel(self, job):
+        job.cancel_event.set()
+        # A job still waiting for a worker never starts; a running one sees the event
+        if job.future is not None and job.future.cancel():
+            self._finish(job, CANCELLED)
+            if job.on_finish is not None:
+                job.on_finish(job)
+
+    def _run(self, job, fn):
+        if job.cancel_event.is_set():
+            self._finish(job, CANCELLED)
+        else:
+            job.status = RUNNING
+            try:
+                result = fn(job.cancel_event)
+                if job.cancel_event.is_set():
+                    self._finish(job, CANCELLED)
+                else:
+                    job.result = result
+                    self._finish(job, DONE)
+            except Exception as e:
+                job.error = str(e)
+                self._finish(job, FAILED)
+
+        if job.on_finish is not None:
+            job.on_finish(job)
+
+    def _finish(self, job, status):
+        job.status = status
+        job.finished_at = time.time()
+
+    def _prune(self):
+        cutoff = time.time() - self.retention
+        stale = [job_id for job_id, job in self._jobs.items()
+                 if job.finished_at is not None and job.finished_at < cutoff]
+        for job_id in stale:
+            del self._jobs[job_id]
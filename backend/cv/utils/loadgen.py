@@ -0,0 +1,330 @@
+import argparse
+import base64
+import glob
+import http.client
+import io
+import json
+import logging
+import os
+import random
+import sys
+import threading
+import time
+import wave
+from urllib.parse import urlsplit
+import numpy as np
+import cv2
+
+# Closed-loop load generator for the CV service:
+#   python -m utils.loadgen --local --sessions 20 --fps 10 --duration 60
+#   python -m utils.loadgen --url http://cv-node:5001 --sessions 50 --frames recorded/
+# Each simulated session creates itself, then posts frames to /detect at the
+# target fps, waiting for every response before sending the next frame (a
+# slow server lowers the achieved fps instead of piling up requests). Now
+# and then it verifies a chord and skips ahead. --local runs the app in this
+# process on the stub detector, so results don't depend on model weights.
+
+
+def percentile_summary(latencies):
+    if not latencies:
+        return {}
+    ms = np.array(latencies) * 1000.0
+    return {
+        "p50_ms": float(np.percentile(ms, 50)),
+        "p90_ms": float(np.percentile(ms, 90)),
+        "p99_ms": float(np.percentile(ms, 99)),
+        "max_ms": float(ms.max()),
+        "mean_ms": float(ms.mean()),
+    }
+
+
+class LoadStats:
+    """Latencies and outcomes per endpoint, shared by all session threads"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = {}
+        self.outcomes = {}
+        self.frames_sent = 0
+        self.frames_late = 0
+
+    def record(self, endpoint, seconds, outcome):
+        with self._lock:
+            self.latencies.setdefault(endpoint, []).append(seconds)
+            counts = self.outcomes.setdefault(endpoint, {})
+            counts[outcome] = counts.get(outcome, 0) + 1
+
+    def frame(self, late):
+        with self._lock:
+            self.frames_sent += 1
+            self.frames_late += int(late)
+
+    def report(self, elapsed, sessions, fps):
+        with self._lock:
+            endpoints = {}
+            total = errors = 0
+            for endpoint, latencies in sorted(self.latencies.items()):
+                counts = dict(self.outcomes.get(endpoint, {}))
+                failed = sum(v for k, v in counts.items() if k not in ("ok", "skipped"))
+                total += len(latencies)
+                errors += failed
+                endpoints[endpoint] = dict(
+                    requests=len(latencies),
+                    throughput_rps=len(latencies) / elapsed if elapsed else 0.0,
+                    error_rate=failed / len(latencies) if latencies else 0.0,
+                    outcomes=counts,
+                    **percentile_summary(latencies),
+                )
+            return {
+                "sessions": sessions,
+                "target_fps_per_session": fps,
+                "duration_s": elapsed,
+                "requests": total,
+                "throughput_rps": total / elapsed if elapsed else 0.0,
+                "error_rate": errors / total if total else 0.0,
+                "frames_sent": self.frames_sent,
+                "achieved_fps_per_session": self.frames_sent / elapsed / sessions if elapsed and sessions else 0.0,
+                "late_frame_ratio": self.frames_late / self.frames_sent if self.frames_sent else 0.0,
+                "endpoints": endpoints,
+            }
+
+
+class Client:
+    """One keep-alive HTTP connection, as a browser tab would hold"""
+
+    def __init__(self, base_url, timeout=30.0):
+        parts = urlsplit(base_url)
+        self.host, self.port = parts.hostname, parts.port or 80
+        self.timeout = timeout
+        self.conn = None
+
+    def request(self, method, path, body=None, content_type="application/json"):
+        """(status, parsed JSON or None); reconnects once if the server closed the socket"""
+        if isinstance(body, (dict, list)):
+            body = json.dumps(body).encode()
+        headers = {"Content-Type": content_type} if body is not None else {}
+        for attempt in range(2):
+            if self.conn is None:
+                self.conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+            try:
+                self.conn.request(method, path, body=body, headers=headers)
+                response = self.conn.getresponse()
+                data = response.read()
+                break
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                self.close()
+                if attempt:
+                    raise
+        try:
+            return response.status, json.loads(data) if data else None
+        except ValueError:
+            return response.status, None
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+
+def timed(stats, client, endpoint, method, path, body=None, content_type="application/json"):
+    started = time.perf_counter()
+    try:
+        status, payload = client.request(method, path, body, content_type)
+    except Exception as e:
+        stats.record(endpoint, time.perf_counter() - started, type(e).__name__)
+        return None, None
+    elapsed = time.perf_counter() - started
+    if isinstance(payload, dict) and payload.get("skipped"):
+        outcome = "skipped"  # shed by admission control (429 on /detect)
+    elif status >= 400:
+        outcome = f"http_{status}"
+    elif isinstance(payload, dict) and payload.get("success") is False:
+        outcome = "failed"
+    else:
+        outcome = "ok"
+    stats.record(endpoint, elapsed, outcome)
+    return status, payload
+
+
+def load_jpegs(frames_dir=None, width=640, height=480, count=30):
+    """Recorded JPEG sequence, or a synthetic one with a little motion"""
+    if frames_dir:
+        paths = sorted(glob.glob(os.path.join(frames_dir, "*.jpg")) + glob.glob(os.path.join(frames_dir, "*.jpeg")))
+        if not paths:
+            raise SystemExit(f"No .jpg frames in {frames_dir}")
+        return [open(p, "rb").read() for p in paths]
+
+    from utils.benchmark import synthetic_frame
+    base = synthetic_frame(width, height)
+    jpegs = []
+    for i in range(count):
+        shift = np.float32([[1, 0, 3 * np.sin(i / 5)], [0, 1, 2 * np.cos(i / 7)]])
+        frame = cv2.warpAffine(base, shift, (width, height), borderMode=cv2.BORDER_REFLECT)
+        jpegs.append(cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, 80])[1].tobytes())
+    return jpegs
+
+
+def wav_bytes(samples, sr):
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(sr)
+        wav.writeframes((np.clip(samples, -1, 1) * 32767).astype("<i2").tobytes())
+    return buffer.getvalue()
+
+
+class ChordClips:
+    """Synthesized 1.5s WAV clips per chord, built once and shared"""
+
+    def __init__(self):
+        self._clips = {}
+        self._lock = threading.Lock()
+
+    def get(self, chord):
+        with self._lock:
+            if chord not in self._clips:
+                from utils.benchmark import SR, synth_chord
+                self._clips[chord] = wav_bytes(synth_chord(chord, 1.5), SR)
+            return self._clips[chord]
+
+
+def run_session(index, args, base_url, jpegs, clips, stats, deadline):
+    rng = random.Random(args.seed + index)
+    client = Client(base_url)
+    session_id = f"load-{os.getpid()}-{index}"
+    try:
+        status, payload = timed(stats, client, "/session/create", "POST", "/session/create",
+                                {"session_id": session_id, "difficulty": args.difficulty})
+        if status != 200:
+            return
+        chord = payload.get("current_chord")
+
+        interval = 1.0 / args.fps
+        next_frame = time.perf_counter()
+        next_verify = next_frame + rng.expovariate(1.0 / args.verify_every) if args.verify_every else None
+        position = rng.randrange(len(jpegs))
+        while time.perf_counter() < deadline:
+            now = time.perf_counter()
+            late = now - next_frame > interval
+            if now < next_frame:
+                time.sleep(next_frame - now)
+            # Behind schedule: send right away but don't burst to catch up
+            next_frame = max(next_frame, time.perf_counter()) + interval
+
+            image = "data:image/jpeg;base64," + base64.b64encode(jpegs[position % len(jpegs)]).decode()
+            position += 1
+            _, payload = timed(stats, client, "/detect", "POST", "/detect",
+                               {"session_id": session_id, "image": image})
+            stats.frame(late)
+            if isinstance(payload, dict) and "current_chord" in payload:
+                chord = payload["current_chord"]
+            if args.adaptive and isinstance(payload, dict) and "recommended_interval_ms" in payload:
+                # Behave like a client that follows the server's pacing advice
+                interval = max(1.0 / args.fps, payload["recommended_interval_ms"] / 1000.0)
+            if chord is None:
+                # Sequence finished - start over like a student picking a new lesson
+                _, payload = timed(stats, client, "/session/create", "POST", "/session/create",
+                                   {"session_id": session_id, "difficulty": args.difficulty})
+                chord = (payload or {}).get("current_chord")
+                continue
+
+            if next_verify is not None and time.perf_counter() >= next_verify:
+                next_verify = time.perf_counter() + rng.expovariate(1.0 / args.verify_every)
+                if rng.random() < args.skip_ratio:
+                    timed(stats, client, "/session/next", "POST", f"/session/{session_id}/next")
+                elif args.verify_mode == "clip":
+                    # Mostly the right chord, sometimes a wrong one
+                    played = chord if rng.random() < 0.7 else "G" if chord != "G" else "C"
+                    timed(stats, client, "/verify-chord/clip", "POST",
+                          f"/verify-chord/clip?session_id={session_id}", clips.get(played), "audio/wav")
+                else:
+                    timed(stats, client, "/verify-chord", "POST", "/verify-chord", {"session_id": session_id})
+    finally:
+        timed(stats, client, "/session/delete", "DELETE", f"/session/{session_id}")
+        client.close()
+
+
+def start_local_server(port=0):
+    """Serve main.app from a background thread; returns (base_url, server)"""
+    os.environ.setdefault("CV_MODEL_BACKEND", "stub")
+    os.environ.setdefault("CV_LOG_LEVEL", "WARNING")
+    from werkzeug.serving import WSGIRequestHandler, make_server
+    import main
+
+    # Access logs for thousands of frames would drown the progress output
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)
+    WSGIRequestHandler.protocol_version = "HTTP/1.1"
+    server = make_server("127.0.0.1", port, main.app, threaded=True)
+    threading.Thread(target=server.serve_forever, name="local-server", daemon=True).start()
+    return f"http://127.0.0.1:{server.server_port}", server
+
+
+def run_load(args):
+    server = None
+    base_url = args.url
+    if args.local:
+        base_url, server = start_local_server()
+    jpegs = load_jpegs(args.frames, args.width, args.height)
+    clips = ChordClips()
+    stats = LoadStats()
+
+    started = time.perf_counter()
+    deadline = started + args.ramp + args.duration
+    threads = []
+    for i in range(args.sessions):
+        thread = threading.Thread(target=run_session, name=f"session-{i}",
+                                  args=(i, args, base_url, jpegs, clips, stats, deadline), daemon=True)
+        thread.start()
+        threads.append(thread)
+        if args.ramp:
+            time.sleep(args.ramp / args.sessions)
+
+    last_report = time.perf_counter()
+    while any(t.is_alive() for t in threads):
+        time.sleep(0.2)
+        if args.progress and time.perf_counter() - last_report >= args.progress:
+            last_report = time.perf_counter()
+            snapshot = stats.report(last_report - started, args.sessions, args.fps)
+            detect = snapshot["endpoints"].get("/detect", {})
+            print(f"⏱️ {snapshot['duration_s']:.0f}s  {snapshot['throughput_rps']:.0f} req/s  "
+                  f"detect p50 {detect.get('p50_ms', 0):.0f}ms p99 {detect.get('p99_ms', 0):.0f}ms  "
+                  f"errors {snapshot['error_rate']:.1%}", file=sys.stderr)
+    for thread in threads:
+        thread.join()
+
+    report = stats.report(time.perf_counter() - started, args.sessions, args.fps)
+    report["target"] = "local" if args.local else base_url
+    if server is not None:
+        server.shutdown()
+    return report
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Replay frame streams against the CV service")
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--url", help="base URL of a running service, e.g. http://localhost:5001")
+    target.add_argument("--local", action="store_true", help="serve the app in-process (stub model unless CV_MODEL_BACKEND is set)")
+    parser.add_argument("--sessions", type=int, default=10)
+    parser.add_argument("--fps", type=float, default=10.0, help="target frames per second per session")
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds of steady load after ramp-up")
+    parser.add_argument("--ramp", type=float, default=5.0, help="seconds over which sessions start")
+    parser.add_argument("--frames", help="directory of recorded JPEG frames (default: synthetic)")
+    parser.add_argument("--width", type=int, default=640)
+    parser.add_argument("--height", type=int, default=480)
+    parser.add_argument("--difficulty", default="beginner")
+    parser.add_argument("--verify-every", type=float, default=5.0, help="mean seconds between verifications (0 = never)")
+    parser.add_argument("--verify-mode", choices=["clip", "mic"], default="clip",
+                        help="clip: upload synthesized audio; mic: blocking /verify-chord")
+    parser.add_argument("--skip-ratio", type=float, default=0.2, help="share of verifications replaced by /next")
+    parser.add_argument("--adaptive", action="store_true", help="follow recommended_interval_ms from /detect replies")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--progress", type=float, default=5.0, help="seconds between progress lines (0 = quiet)")
+    parser.add_argument("--out", help="write the JSON report here")
+    args = parser.parse_args()
+
+    result = run_load(args)
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(result, f, indent=2)
+    print(json.dumps(result, indent=2))
@@ -0,0 +1,132 @@
+import logging
+import threading
+import time
+from utils.inference import load_detector
+
+logger = logging.getLogger(__name__)
+
+UNLOADED = "unloaded"
+LOADING = "loading"
+READY = "ready"
+FAILED = "failed"
+
+
+class _ModelEntry:
+    __slots__ = ("name", "loader", "warm", "model", "state", "error", "load_seconds", "warmed", "lock")
+
+    def __init__(self, name, loader, warm):
+        self.name = name
+        self.loader = loader
+        self.warm = warm
+        self.model = None
+        self.state = UNLOADED
+        self.error = None
+        self.load_seconds = None
+        self.warmed = False
+        self.lock = threading.Lock()
+
+
+class ModelRegistry:
+    """Named models, each loaded at most once per process and shared by all callers.
+
+    Loading is split from warm-up so a pre-fork server can load weights in
+    the master (workers then share those pages copy-on-write) and run the
+    first inferences in each worker, where the runtime's thread pools live.
+    `get()` loads on first use if nothing loaded the model earlier.
+    """
+
+    def __init__(self):
+        self._entries = {}
+
+    def register(self, name, loader, warm=None):
+        """`loader()` builds the model; `warm(model)` runs its first inferences"""
+        self._entries[name] = _ModelEntry(name, loader, warm)
+
+    def get(self, name):
+        entry = self._entries[name]
+        model = entry.model
+        if model is not None:
+            return model
+        return self.load(name)
+
+    def load(self, name, warm_up=True):
+        """Load (and optionally warm) a model now; returns it, raises if loading fails"""
+        entry = self._entries[name]
+        with entry.lock:
+            if entry.model is None:
+                entry.state = LOADING
+                started = time.perf_counter()
+                try:
+                    model = entry.loader()
+                except Exception as e:
+                    entry.state = FAILED
+                    entry.error = str(e)
+                    logger.exception("❌ Failed to load model %s", name)
+                    raise
+                entry.load_seconds = time.perf_counter() - started
+                entry.model = model
+                entry.error = None
+                logger.info("✅ Loaded model %s in %.2fs", name, entry.load_seconds)
+            if warm_up:
+                self._warm_locked(entry)
+            entry.state = READY
+            return entry.model
+
+    def warm_up(self, name=None):
+        """Warm one model, or every loaded model; loads it first if needed"""
+        names = [name] if name is not None else list(self._entries)
+        for model_name in names:
+            self.load(model_name, warm_up=True)
+
+    def _warm_locked(self, entry):
+        if entry.warmed or entry.warm is None:
+            entry.warmed = True
+            return
+        started = time.perf_counter()
+        entry.warm(entry.model)
+        entry.warmed = True
+        logger.info("🔥 Warmed up model %s in %.2fs", entry.name, time.perf_counter() - started)
+
+    def load_all(self, warm_up=True):
+        for name in self._entries:
+            self.load(name, warm_up=warm_up)
+
+    def load_in_background(self, warm_up=True):
+        """Load every model on a daemon thread; readiness shows up in status()"""
+        def run():
+            for name in self._entries:
+                try:
+                    self.load(name, warm_up=warm_up)
+                except Exception:
+                    pass  # already logged and recorded as FAILED
+        thread = threading.Thread(target=run, name="model-loader", daemon=True)
+        thread.start()
+        return thread
+
+    def state(self, name):
+        return self._entries[name].state
+
+    def ready(self, name=None):
+        """True once the model (or every model) is loaded"""
+        names = [name] if name is not None else list(self._entries)
+        return all(self._entries[n].state == READY for n in names)
+
+    def status(self):
+        return {
+            name: {
+                "state": entry.state,
+                "warmed": entry.warmed,
+                "load_seconds": entry.load_seconds,
+                "error": entry.error,
+            }
+            for name, entry in self._entries.items()
+        }
+
+
+# The process-wide registry; the fret-zone detector is configured by CV_MODEL_* (see utils/inference.py)
+MODELS = ModelRegistry()
+MODELS.register("detector", lambda: load_detector(warm_up=False), warm=lambda model: model.warm_up())
+
+
+def get_detector():
+    return MODELS.get("detector")
@@ -1,28 +1,18 @@
+import logging
 import cv2
+from utils.chord_geometry import ChordTable
+
+logger = logging.getLogger(__name__)
 
 def draw_fretboard_overlay(frame, chord_data, chord_name, fret_boxes):
-    num_strings = 6
-    positions = chord_data.get(chord_name, [])
-    if not positions:
-        print(f"⚠️ No data for chord: {chord_name}")
+    """Draw the chord's finger dots; `chord_data` is a ChordTable (or a raw chord dict)"""
+    table = chord_data if isinstance(chord_data, ChordTable) else ChordTable(chord_data)
+    if chord_name not in table:
+        logger.debug("⚠️ No data for chord: %s", chord_name)
         return frame
 
-    for fret, string in positions:
-        if fret not in fret_boxes or not (1 <= string <= 6):
-            continue
-
-        x1, y1, x2, y2 = fret_boxes[fret]
-        if x2 <= x1:
-            print(f"⚠️ Invalid box for fret {fret}")
-            continue
-
-        string_spacing = (x2 - x1) / (num_strings - 1)
-        col = num_strings - string  # reversed direction
-
-        cx = int(x1 + col * string_spacing)
-        cy = int((y1 + y2) / 2)
-
-        print(f"🎯 Fret {fret}, String {string} → Dot at ({cx}, {cy})")
+    _, _, xs, ys = table.overlay_points(chord_name, fret_boxes)
+    for cx, cy in zip(xs.tolist(), ys.tolist()):
         cv2.circle(frame, (cx, cy), 14, (0, 0, 255), -1)  # slightly larger dot
 
-    return frame
\ No newline at end of file
+    return frame
@@ -0,0 +1,240 @@
+import threading
+import time
+from collections import deque
+import cv2
+import numpy as np
+
+# Live capture -> inference -> render pipeline. Each stage runs at its own pace
+# and hands frames on through a one-slot "latest frame wins" buffer, so a slow
+# inference drops stale frames instead of queueing them up behind it.
+
+
+class LatestSlot:
+    """One-item handoff between two threads; a newer put replaces an unread item"""
+
+    def __init__(self):
+        self._item = None
+        self._cond = threading.Condition()
+        self._closed = False
+        self.dropped = 0
+
+    def put(self, item):
+        with self._cond:
+            if self._item is not None:
+                self.dropped += 1
+            self._item = item
+            self._cond.notify()
+
+    def get(self, timeout=None):
+        """Newest item, or None once closed (or on timeout)"""
+        with self._cond:
+            if self._item is None and not self._closed:
+                self._cond.wait(timeout)
+            item, self._item = self._item, None
+            return item
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    @property
+    def closed(self):
+        return self._closed
+
+
+class FramePacket:
+    __slots__ = ("seq", "frame", "captured_at", "inferred_at", "fret_boxes")
+
+    def __init__(self, seq, frame, captured_at):
+        self.seq = seq
+        self.frame = frame
+        self.captured_at = captured_at
+        self.inferred_at = None
+        self.fret_boxes = None
+
+
+class FrameSource:
+    """Camera index or video file behind one read() interface.
+
+    Video files are paced to their own frame rate when `realtime` is set, so
+    a benchmark sees the same arrival rate as a camera; otherwise frames are
+    read as fast as the capture thread can go.
+    """
+
+    def __init__(self, source, realtime=True):
+        self.is_camera = isinstance(source, int) or str(source).isdigit()
+        self.cap = cv2.VideoCapture(int(source) if self.is_camera else str(source))
+        if not self.cap.isOpened():
+            raise IOError(f"Could not open video source {source!r}")
+        if self.is_camera:
+            # Keep the driver from buffering stale frames ahead of us
+            self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        fps = self.cap.get(cv2.CAP_PROP_FPS) or 0.0
+        self.interval = 1.0 / fps if (realtime and not self.is_camera and fps > 0) else 0.0
+        self._next_at = None
+
+    def read(self):
+        """Next BGR frame, or None at end of stream"""
+        if self.interval:
+            now = time.perf_counter()
+            if self._next_at is not None and now < self._next_at:
+                time.sleep(self._next_at - now)
+            self._next_at = max(now, self._next_at or now) + self.interval
+        ok, frame = self.cap.read()
+        return frame if ok else None
+
+    def close(self):
+        self.cap.release()
+
+
+class PipelineStats:
+    """Per-stage counters plus a rolling window of capture-to-display latencies"""
+
+    def __init__(self, window=300):
+        self._lock = threading.Lock()
+        self.started = time.perf_counter()
+        self.captured = 0
+        self.inferred = 0
+        self.rendered = 0
+        self._latencies = deque(maxlen=window)
+        self._inference = deque(maxlen=window)
+        self._render_times = deque(maxlen=window)
+
+    def count(self, stage):
+        with self._lock:
+            setattr(self, stage, getattr(self, stage) + 1)
+
+    def record_inference(self, seconds):
+        with self._lock:
+            self.inferred += 1
+            self._inference.append(seconds)
+
+    def record_render(self, packet, shown_at):
+        with self._lock:
+            self.rendered += 1
+            self._latencies.append(shown_at - packet.captured_at)
+            self._render_times.append(shown_at)
+
+    def snapshot(self, capture_slot=None, render_slot=None):
+        with self._lock:
+            elapsed = time.perf_counter() - self.started
+            latencies = np.array(self._latencies) * 1000.0
+            inference = np.array(self._inference) * 1000.0
+            recent = list(self._render_times)
+            stats = {
+                "elapsed_s": elapsed,
+                "captured": self.captured,
+                "inferred": self.inferred,
+                "rendered": self.rendered,
+                "capture_fps": self.captured / elapsed if elapsed else 0.0,
+                "render_fps": self.rendered / elapsed if elapsed else 0.0,
+            }
+        if len(recent) > 1 and recent[-1] > recent[0]:
+            stats["recent_render_fps"] = (len(recent) - 1) / (recent[-1] - recent[0])
+        if latencies.size:
+            stats["latency_ms"] = {
+                "p50": float(np.percentile(latencies, 50)),
+                "p95": float(np.percentile(latencies, 95)),
+                "max": float(latencies.max()),
+            }
+        if inference.size:
+            stats["inference_ms"] = {
+                "p50": float(np.percentile(inference, 50)),
+                "p95": float(np.percentile(inference, 95)),
+            }
+        if capture_slot is not None:
+            stats["dropped_before_inference"] = capture_slot.dropped
+        if render_slot is not None:
+            stats["dropped_before_render"] = render_slot.dropped
+        return stats
+
+
+class LivePipeline:
+    """Capture and inference threads feeding a render loop on the calling thread.
+
+    `detect(frame)` returns {fret: box}; `render(frame, fret_boxes)` draws and
+    shows a frame and returns False to stop. Rendering stays on the caller's
+    thread because most GUI backends (cv2.imshow included) need that.
+    """
+
+    def __init__(self, source, detect, render, max_frames=None):
+        self.source = source
+        self.detect = detect
+        self.render = render
+        self.max_frames = max_frames
+        self.stats = PipelineStats()
+        self.capture_slot = LatestSlot()
+        self.render_slot = LatestSlot()
+        self._stop = threading.Event()
+        self._threads = []
+
+    def _capture_loop(self):
+        seq = 0
+        try:
+            while not self._stop.is_set():
+                frame = self.source.read()
+                if frame is None:
+                    break
+                self.capture_slot.put(FramePacket(seq, frame, time.perf_counter()))
+                self.stats.count("captured")
+                seq += 1
+                if self.max_frames is not None and seq >= self.max_frames:
+                    break
+        finally:
+            self.capture_slot.close()
+
+    def _inference_loop(self):
+        try:
+            while not self._stop.is_set():
+                packet = self.capture_slot.get(timeout=0.1)
+                if packet is None:
+                    if self.capture_slot.closed:
+                        break
+                    continue
+                started = time.perf_counter()
+                packet.fret_boxes = self.detect(packet.frame)
+                packet.inferred_at = time.perf_counter()
+                self.stats.record_inference(packet.inferred_at - started)
+                self.render_slot.put(packet)
+        finally:
+            self.render_slot.close()
+
+    def start(self):
+        for target, name in ((self._capture_loop, "capture"), (self._inference_loop, "inference")):
+            thread = threading.Thread(target=target, name=name, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self):
+        self._stop.set()
+        self.capture_slot.close()
+        self.render_slot.close()
+        for thread in self._threads:
+            thread.join(timeout=2.0)
+        self.source.close()
+
+    def run(self, on_stats=None, stats_interval=1.0):
+        """Render until the source ends or render() returns False; returns final stats"""
+        self.start()
+        next_report = time.perf_counter() + stats_interval
+        try:
+            while True:
+                packet = self.render_slot.get(timeout=0.1)
+                if packet is None:
+                    if self.render_slot.closed:
+                        break
+                    continue
+                keep_going = self.render(packet.frame, packet.fret_boxes)
+                self.stats.record_render(packet, time.perf_counter())
+                if keep_going is False:
+                    break
+                if on_stats is not None and time.perf_counter() >= next_report:
+                    on_stats(self.snapshot())
+                    next_report += stats_interval
+        finally:
+            self.stop()
+        return self.snapshot()
+
+    def snapshot(self):
+        return self.stats.snapshot(self.capture_slot, self.render_slot)
@@ -0,0 +1,226 @@
+import asyncio
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from utils.audio_chord_detector import matches_chord
+from utils.audio_stream import StreamingChromaEngine
+
+logger = logging.getLogger(__name__)
+
+
+class _LiveSession:
+    """Loop-side state of one live session; only touched on the runtime's event loop"""
+
+    def __init__(self, session_id, sr, n_fft, hop_length, audio_queue):
+        self.session_id = session_id
+        self.engine = StreamingChromaEngine(sr, n_fft=n_fft, hop_length=hop_length)
+        self.frame = None
+        self.frame_ready = asyncio.Event()
+        self.audio = asyncio.Queue(maxsize=audio_queue)
+        self.chord = None
+        self.guitar_seen = None
+        self.listening = False
+        self.confidence = 0.0
+        self.frames_dropped = 0
+        self.audio_dropped = 0
+        self.tasks = []
+
+
+class SessionRuntime:
+    """Vision and listening side by side per session on one shared asyncio loop.
+
+    Each live session runs two tasks: one takes the latest frame (older
+    unprocessed ones are dropped) and runs `detect(session_id, data, seq)`
+    on the executor, the other feeds streamed audio blocks into a
+    StreamingChromaEngine. Audio is only scored while the guitar was seen
+    within `vision_grace` seconds; once the expected chord is heard,
+    `confirm(session_id, chord)` records it on the executor. Every result
+    goes out as one combined state through `push(session_id, state)`.
+
+    `detect` returns a compact overlay dict with at least "chord" and
+    "detected"; `confirm` returns the verification response or None. The
+    loop runs on its own thread, started on first use and restarted in a
+    forked child; callers on other threads use open/feed_*/close.
+    """
+
+    def __init__(self, detect, confirm, push, workers=8, vision_grace=1.0, min_duration=0.25,
+                 n_fft=2048, hop_length=512, audio_queue=64):
+        self.detect = detect
+        self.confirm = confirm
+        self.push = push
+        self.workers = workers
+        self.vision_grace = vision_grace
+        self.min_duration = min_duration
+        self.n_fft = n_fft
+        self.hop_length = hop_length
+        self.audio_queue = audio_queue
+
+        self._lock = threading.Lock()
+        self._loop = None
+        self._executor = None
+        self._pid = None
+        self._sessions = {}
+        self._live = set()
+        self.confirmed = 0
+
+    def open(self, session_id, sr):
+        """Start (or restart) live processing for a session with `sr` Hz audio"""
+        loop = self._ensure_loop()
+        with self._lock:
+            self._live.add(session_id)
+        loop.call_soon_threadsafe(self._open_now, session_id, sr)
+
+    def close(self, session_id):
+        with self._lock:
+            if session_id not in self._live:
+                return
+            self._live.discard(session_id)
+            loop = self._loop
+        loop.call_soon_threadsafe(self._close_now, session_id)
+
+    def is_live(self, session_id):
+        with self._lock:
+            return session_id in self._live and self._pid == os.getpid()
+
+    def feed_frame(self, session_id, data, seq=None):
+        self._ensure_loop().call_soon_threadsafe(self._put_frame, session_id, data, seq)
+
+    def feed_audio(self, session_id, samples):
+        self._ensure_loop().call_soon_threadsafe(self._put_audio, session_id, samples)
+
+    def session_count(self):
+        with self._lock:
+            return len(self._live)
+
+    def stats(self):
+        with self._lock:
+            return {"sessions": len(self._live), "confirmed": self.confirmed,
+                    "running": self._loop is not None and self._pid == os.getpid()}
+
+    def _ensure_loop(self):
+        with self._lock:
+            if self._loop is None or self._pid != os.getpid():
+                # First use, or a forked child that inherited a loop without its thread
+                self._pid = os.getpid()
+                self._live = set()
+                self._sessions = {}
+                self._loop = asyncio.new_event_loop()
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="live")
+                threading.Thread(target=self._loop.run_forever, name="live-runtime", daemon=True).start()
+            return self._loop
+
+    # Everything below runs on the event loop
+
+    def _open_now(self, session_id, sr):
+        self._close_now(session_id)
+        live = _LiveSession(session_id, sr, self.n_fft, self.hop_length, self.audio_queue)
+        live.tasks = [
+            asyncio.ensure_future(self._vision(live)),
+            asyncio.ensure_future(self._listen(live)),
+        ]
+        self._sessions[session_id] = live
+        logger.info("🎛️ Live session %s started (%d Hz audio)", session_id, sr)
+
+    def _close_now(self, session_id):
+        live = self._sessions.pop(session_id, None)
+        if live is None:
+            return
+        for task in live.tasks:
+            task.cancel()
+        logger.info("🎛️ Live session %s stopped", session_id)
+
+    def _put_frame(self, session_id, data, seq):
+        live = self._sessions.get(session_id)
+        if live is None:
+            return
+        if live.frame is not None:
+            live.frames_dropped += 1
+        live.frame = (data, seq)
+        live.frame_ready.set()
+
+    def _put_audio(self, session_id, samples):
+        live = self._sessions.get(session_id)
+        if live is None:
+            return
+        if live.audio.full():
+            # Keep the newest audio; the chord being held now is what matters
+            live.audio.get_nowait()
+            live.audio_dropped += 1
+        live.audio.put_nowait(samples)
+
+    def _guitar_visible(self, live):
+        return live.guitar_seen is not None and \
+            asyncio.get_running_loop().time() - live.guitar_seen <= self.vision_grace
+
+    def _state(self, live, **extra):
+        state = {
+            "session_id": live.session_id,
+            "chord": live.chord,
+            "listening": live.listening,
+            "confidence": round(live.confidence, 3),
+            "frames_dropped": live.frames_dropped,
+        }
+        state.update(extra)
+        return state
+
+    def _emit(self, live, **extra):
+        try:
+            self.push(live.session_id, self._state(live, **extra))
+        except Exception:
+            logger.exception("❌ Failed to push live state for %s", live.session_id)
+
+    async def _vision(self, live):
+        loop = asyncio.get_running_loop()
+        while True:
+            await live.frame_ready.wait()
+            live.frame_ready.clear()
+            data, seq = live.frame
+            live.frame = None
+            try:
+                overlay = await loop.run_in_executor(self._executor, self.detect, live.session_id, data, seq)
+            except Exception as e:
+                logger.exception("❌ Live detection error for %s: %s", live.session_id, e)
+                self._emit(live, seq=seq, error=str(e))
+                continue
+            if overlay.get("detected"):
+                live.guitar_seen = loop.time()
+            live.chord = overlay.get("chord")
+            self._emit(live, overlay=overlay)
+
+    async def _listen(self, live):
+        loop = asyncio.get_running_loop()
+        min_frames = max(1, int(self.min_duration * live.engine.sr / self.hop_length))
+        while True:
+            block = await live.audio.get()
+            listening = live.chord is not None and self._guitar_visible(live)
+            if listening != live.listening:
+                live.listening = listening
+                if not listening:
+                    # Whatever was heard before the guitar left the picture doesn't count
+                    live.engine.reset()
+                    live.confidence = 0.0
+                self._emit(live)
+            if not listening:
+                continue
+
+            if not live.engine.push(block) or live.engine.frames < min_frames:
+                continue
+            chord = live.chord
+            matched, live.confidence = matches_chord(live.engine.chroma(), chord)
+            if not matched:
+                continue
+
+            live.engine.reset()
+            try:
+                response = await loop.run_in_executor(self._executor, self.confirm, live.session_id, chord)
+            except Exception as e:
+                logger.exception("❌ Live verification error for %s: %s", live.session_id, e)
+                continue
+            if response is None:
+                continue  # the session moved on while we were listening
+            with self._lock:
+                self.confirmed += 1
+            if live.chord == chord:
+                live.chord = response.get("next_chord")
+            self._emit(live, verification=response)
@@ -0,0 +1,373 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+class Session:
+    """One practice session's progress through its chord sequence"""
+
+    __slots__ = ("session_id", "difficulty", "chord_sequence", "current_chord_idx",
+                 "start_time", "last_seen", "attempts", "score", "completed_chords")
+
+    def __init__(self, session_id, difficulty, chord_sequence, current_chord_idx=0,
+                 start_time=None, last_seen=None, attempts=0, score=0, completed_chords=None):
+        now = time.time()
+        self.session_id = session_id
+        self.difficulty = difficulty
+        self.chord_sequence = list(chord_sequence)
+        self.current_chord_idx = current_chord_idx
+        self.start_time = start_time if start_time is not None else now
+        self.last_seen = last_seen if last_seen is not None else now
+        self.attempts = attempts
+        self.score = score
+        self.completed_chords = list(completed_chords or [])
+
+    def current_chord(self):
+        if self.current_chord_idx < len(self.chord_sequence):
+            return self.chord_sequence[self.current_chord_idx]
+        return None
+
+    def advance(self):
+        """Mark the current chord done; returns True while chords remain"""
+        self.completed_chords.append(self.chord_sequence[self.current_chord_idx])
+        self.current_chord_idx += 1
+        self.score += 10
+        self.attempts = 0
+        return self.current_chord_idx < len(self.chord_sequence)
+
+    def copy(self):
+        return Session(**self.to_dict())
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**data)
+
+
+class TTLCache:
+    """Thread-safe LRU mapping with an idle TTL and a capacity limit.
+
+    Entries not touched for `ttl` seconds, or pushed out by `capacity`, are
+    dropped and reported to the `on_evict(key, value)` callbacks. Expiry is
+    checked on every access, so an idle entry is never handed out again even
+    if nothing new is inserted.
+    """
+
+    def __init__(self, capacity=10000, ttl=1800):
+        self.capacity = capacity
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> [value, last_seen], least recently used first
+        self._lock = threading.Lock()
+        self._listeners = []
+
+    def on_evict(self, callback):
+        self._listeners.append(callback)
+
+    def get(self, key):
+        with self._lock:
+            evicted = self._expire_locked(key)
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry[1] = time.time()
+                self._entries.move_to_end(key)
+        self._notify(evicted)
+        return entry[0] if entry is not None else None
+
+    def set(self, key, value):
+        evicted = []
+        with self._lock:
+            self._entries[key] = [value, time.time()]
+            self._entries.move_to_end(key)
+            evicted = self._evict_locked()
+        self._notify(evicted)
+
+    def get_or_create(self, key, factory):
+        with self._lock:
+            evicted = self._expire_locked(key)
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry[1] = time.time()
+                self._entries.move_to_end(key)
+                value = entry[0]
+            else:
+                value = factory()
+                self._entries[key] = [value, time.time()]
+                evicted += self._evict_locked()
+        self._notify(evicted)
+        return value
+
+    def pop(self, key):
+        with self._lock:
+            entry = self._entries.pop(key, None)
+        return entry[0] if entry is not None else None
+
+    def sweep(self):
+        """Drop expired entries now rather than on the next insert"""
+        with self._lock:
+            evicted = self._evict_locked()
+        self._notify(evicted)
+        return len(evicted)
+
+    def __contains__(self, key):
+        with self._lock:
+            evicted = self._expire_locked(key)
+            found = key in self._entries
+        self._notify(evicted)
+        return found
+
+    def __len__(self):
+        with self._lock:
+            evicted = self._evict_locked()
+            count = len(self._entries)
+        self._notify(evicted)
+        return count
+
+    def _expire_locked(self, key):
+        """[(key, value)] if `key` has been idle past the TTL (and is now dropped), else []"""
+        entry = self._entries.get(key)
+        if entry is None or time.time() - entry[1] <= self.ttl:
+            return []
+        del self._entries[key]
+        return [(key, entry[0])]
+
+    def _evict_locked(self):
+        evicted = []
+        cutoff = time.time() - self.ttl
+        while self._entries:
+            key, (value, last_seen) = next(iter(self._entries.items()))
+            if last_seen >= cutoff and len(self._entries) <= self.capacity:
+                break
+            del self._entries[key]
+            evicted.append((key, value))
+        return evicted
+
+    def _notify(self, evicted):
+        for key, value in evicted:
+            for callback in self._listeners:
+                callback(key, value)
+
+
+class InMemorySessionStore:
+    """Sessions for a single worker process, each guarded by its own lock"""
+
+    def __init__(self, capacity=10000, ttl=1800):
+        self._cache = TTLCache(capacity, ttl)
+        self._listeners = []
+        self._cache.on_evict(lambda session_id, entry: self._notify(session_id))
+
+    def on_evict(self, callback):
+        """`callback(session_id)` runs when a session expires, is pushed out or deleted"""
+        self._listeners.append(callback)
+
+    def create(self, session_id, difficulty, chord_sequence):
+        session = Session(session_id, difficulty, chord_sequence)
+        self._cache.set(session_id, (session, threading.Lock()))
+        return session.copy()
+
+    def get(self, session_id):
+        """Snapshot of the session, or None"""
+        entry = self._cache.get(session_id)
+        if entry is None:
+            return None
+        session, lock = entry
+        with lock:
+            return session.copy()
+
+    def update(self, session_id, fn):
+        """Run fn(session) under the session's lock; returns fn's result, or None if unknown"""
+        entry = self._cache.get(session_id)
+        if entry is None:
+            return None
+        session, lock = entry
+        with lock:
+            session.last_seen = time.time()
+            return fn(session)
+
+    def delete(self, session_id):
+        entry = self._cache.pop(session_id)
+        if entry is None:
+            return None
+        self._notify(session_id)
+        return entry[0].copy()
+
+    def sweep(self):
+        return self._cache.sweep()
+
+    def __contains__(self, session_id):
+        return session_id in self._cache
+
+    def __len__(self):
+        return len(self._cache)
+
+    def _notify(self, session_id):
+        for callback in self._listeners:
+            callback(session_id)
+
+
+class SqliteSessionStore:
+    """Sessions in a SQLite file shared by every worker process on the host.
+
+    Updates run inside BEGIN IMMEDIATE transactions, so a read-modify-write
+    of one session is atomic across processes. Expired and over-capacity
+    sessions are swept by whichever worker creates the next session, and a
+    session idle past the TTL is dropped as soon as it is looked up. Reads
+    run outside transactions and only refresh `last_seen` every
+    `touch_interval` seconds, so per-frame lookups don't take the write lock.
+    """
+
+    touch_interval = 5.0
+
+    def __init__(self, path, capacity=10000, ttl=1800):
+        self.path = path
+        self.capacity = capacity
+        self.ttl = ttl
+        self._local = threading.local()
+        self._listeners = []
+        with self._transaction() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS sessions ("
+                " session_id TEXT PRIMARY KEY,"
+                " data TEXT NOT NULL,"
+                " last_seen REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS sessions_last_seen ON sessions (last_seen)")
+
+    def on_evict(self, callback):
+        self._listeners.append(callback)
+
+    def _connection(self):
+        """One autocommit connection per thread (and per process - never reuse one across fork)"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=10.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _transaction(self):
+        return _Transaction(self._connection())
+
+    def create(self, session_id, difficulty, chord_sequence):
+        session = Session(session_id, difficulty, chord_sequence)
+        with self._transaction() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO sessions (session_id, data, last_seen) VALUES (?, ?, ?)",
+                (session_id, json.dumps(session.to_dict()), session.last_seen)
+            )
+        self.sweep()
+        return session
+
+    def get(self, session_id):
+        conn = self._connection()
+        row = conn.execute("SELECT data, last_seen FROM sessions WHERE session_id = ?",
+                           (session_id,)).fetchone()
+        if row is None:
+            return None
+        now = time.time()
+        if now - row[1] > self.ttl:
+            self._expire(session_id)
+            return None
+        if now - row[1] > self.touch_interval:
+            conn.execute("UPDATE sessions SET last_seen = ? WHERE session_id = ?", (now, session_id))
+        return Session.from_dict(json.loads(row[0]))
+
+    def update(self, session_id, fn):
+        with self._transaction() as conn:
+            row = conn.execute("SELECT data, last_seen FROM sessions WHERE session_id = ?",
+                               (session_id,)).fetchone()
+            if row is None:
+                return None
+            expired = time.time() - row[1] > self.ttl
+            if expired:
+                conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+            else:
+                session = Session.from_dict(json.loads(row[0]))
+                session.last_seen = time.time()
+                result = fn(session)
+                conn.execute(
+                    "UPDATE sessions SET data = ?, last_seen = ? WHERE session_id = ?",
+                    (json.dumps(session.to_dict()), session.last_seen, session_id)
+                )
+        if expired:
+            self._notify([session_id])
+            return None
+        return result
+
+    def delete(self, session_id):
+        with self._transaction() as conn:
+            row = conn.execute("SELECT data FROM sessions WHERE session_id = ?", (session_id,)).fetchone()
+            if row is None:
+                return None
+            conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+        self._notify([session_id])
+        return Session.from_dict(json.loads(row[0]))
+
+    def sweep(self):
+        cutoff = time.time() - self.ttl
+        with self._transaction() as conn:
+            expired = [r[0] for r in conn.execute(
+                "SELECT session_id FROM sessions WHERE last_seen < ?", (cutoff,))]
+            overflow = [r[0] for r in conn.execute(
+                "SELECT session_id FROM sessions WHERE last_seen >= ? "
+                "ORDER BY last_seen DESC LIMIT -1 OFFSET ?", (cutoff, self.capacity))]
+            evicted = expired + overflow
+            conn.executemany("DELETE FROM sessions WHERE session_id = ?", [(s,) for s in evicted])
+        self._notify(evicted)
+        return len(evicted)
+
+    def __contains__(self, session_id):
+        row = self._connection().execute(
+            "SELECT last_seen FROM sessions WHERE session_id = ?", (session_id,)).fetchone()
+        if row is None:
+            return False
+        if time.time() - row[0] > self.ttl:
+            self._expire(session_id)
+            return False
+        return True
+
+    def __len__(self):
+        return self._connection().execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+
+    def _expire(self, session_id):
+        """Drop a session found idle past the TTL, unless another worker touched it meanwhile"""
+        with self._transaction() as conn:
+            deleted = conn.execute("DELETE FROM sessions WHERE session_id = ? AND last_seen < ?",
+                                   (session_id, time.time() - self.ttl)).rowcount
+        if deleted:
+            self._notify([session_id])
+
+    def _notify(self, session_ids):
+        for session_id in session_ids:
+            for callback in self._listeners:
+                callback(session_id)
+
+
+class _Transaction:
+    """BEGIN IMMEDIATE ... COMMIT around a block, rolled back on error"""
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        self.conn.execute("BEGIN IMMEDIATE")
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        self.conn.execute("ROLLBACK" if exc_type else "COMMIT")
+        return False
+
+
+def open_session_store(backend="memory", path="sessions.db", capacity=10000, ttl=1800):
+    """Session store for CV_SESSION_BACKEND: "memory" (one process) or "sqlite" (shared)"""
+    if backend == "memory":
+        return InMemorySessionStore(capacity, ttl)
+    if backend == "sqlite":
+        return SqliteSessionStore(path, capacity, ttl)
+    raise ValueError(f"Unknown session backend: {backend!r}")
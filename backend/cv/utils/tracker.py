@@ -1,22 +1,235 @@
+import threading
 import cv2
-from ultralytics import YOLO
 import numpy as np
+from utils.inference import Detection
+from utils.models import get_detector
+
+def merge_boxes(boxes):
+    """Merge all boxes into one large (x1, y1, x2, y2) box, or None if there are none"""
+    boxes = np.asarray(boxes)
+    if len(boxes) == 0:
+        return None
+    x1 = int(np.min(boxes[:, 0]))
+    y1 = int(np.min(boxes[:, 1]))
+    x2 = int(np.max(boxes[:, 2]))
+    y2 = int(np.max(boxes[:, 3]))
+    return (x1, y1, x2, y2)
 
 class GuitarTracker:
-    def __init__(self):
-        self.model = YOLO("assets/models/best.pt")
+    """Fretboard tracker that only runs the detector on keyframes.
+
+    Between keyframes the last fret boxes are carried forward with sparse
+    Lucas-Kanade optical flow on the fretboard region. A new keyframe is
+    forced every `keyframe_interval` frames, or as soon as the flow
+    confidence (share of points tracked and agreeing on one motion) drops
+    below `min_confidence`, or when the frame size changes.
+
+    Keyframes themselves can go through `detect_roi`, which only infers a
+    padded crop around the last merged fretboard box at a smaller input
+    size, falling back to a full-frame pass when the crop comes back weak
+    or the frame size no longer matches the one the box was found in.
+    """
+
+    def __init__(self, model=None, keyframe_interval=10, min_confidence=0.6, flow_scale=0.5,
+                 roi_imgsz=320, roi_padding=0.25, roi_min_confidence=0.5, roi_min_detections=2):
+        self._model = model
+        self.keyframe_interval = max(1, int(keyframe_interval))
+        self.min_confidence = min_confidence
+        self.flow_scale = flow_scale
+
+        self.roi_imgsz = roi_imgsz
+        self.roi_padding = roi_padding
+        self.roi_min_confidence = roi_min_confidence
+        self.roi_min_detections = roi_min_detections
+
+        self.lock = threading.Lock()
+        self.reset()
+
+    @property
+    def model(self):
+        if self._model is None:
+            # Shared with every other user of the detector in this process
+            self._model = get_detector()
+        return self._model
+
+    def reset(self):
+        self.fret_boxes = {}
+        self.prev_gray = None
+        self.points = None
+        self.frames_since_keyframe = 0
+        self.confidence = 0.0
+        self.keyframes = 0
+        self.tracked_frames = 0
+        self.fretboard_box = None
+        self.fretboard_shape = None
+        self.roi_passes = 0
+        self.roi_fallbacks = 0
 
     def detect_fretboard(self, frame):
-        results = self.model.predict(source=frame, conf=0.4, verbose=False)
-        boxes = results[0].boxes.xyxy.cpu().numpy() if results else []
+        detections = self.model.detect([frame])[0]
+        return merge_boxes([bbox for _, conf, bbox in detections if conf >= 0.4])
+
+    def detect_roi(self, frame, infer):
+        """Detections for `frame` in full-frame coordinates, cropped to the fretboard when possible.
+
+        `infer(image, imgsz)` runs the detector on one image (imgsz=None
+        means the model's full size) and returns its list of Detection.
+        """
+        if self.fretboard_box is not None and self.fretboard_shape != frame.shape[:2]:
+            # The box is in another resolution's pixels
+            self.fretboard_box = None
+
+        if self.fretboard_box is not None:
+            x1, y1, x2, y2 = self._roi_window(frame.shape)
+            if x2 > x1 and y2 > y1:
+                detections = infer(frame[y1:y2, x1:x2], self.roi_imgsz)
+                offset = np.array([x1, y1, x1, y1], dtype=np.float32)
+                detections = [Detection(label, conf, bbox + offset) for label, conf, bbox in detections]
+                if self._remember_fretboard(detections, frame.shape):
+                    self.roi_passes += 1
+                    return detections
+            self.roi_fallbacks += 1
+
+        detections = infer(frame, None)
+        if not self._remember_fretboard(detections, frame.shape):
+            self.fretboard_box = None
+        return detections
+
+    def _remember_fretboard(self, detections, frame_shape):
+        confident = [bbox for _, conf, bbox in detections if conf >= self.roi_min_confidence]
+        if len(confident) < self.roi_min_detections:
+            return False
+        self.fretboard_box = merge_boxes(confident)
+        self.fretboard_shape = frame_shape[:2]
+        return True
+
+    def _roi_window(self, frame_shape):
+        """Last fretboard box grown by `roi_padding` on each side, clipped to the frame"""
+        h, w = frame_shape[:2]
+        x1, y1, x2, y2 = self.fretboard_box
+        pad_x = int((x2 - x1) * self.roi_padding)
+        pad_y = int((y2 - y1) * self.roi_padding)
+        return (max(0, x1 - pad_x), max(0, y1 - pad_y),
+                min(w, x2 + pad_x), min(h, y2 + pad_y))
+
+    def update(self, frame, detect):
+        """Return (fret_boxes, is_keyframe) for this frame.
+
+        `detect(frame)` is the full detector and must return {fret: bbox};
+        it is only called on keyframes.
+        """
+        with self.lock:
+            gray = self._prepare(frame)
+
+            if self._needs_keyframe(gray):
+                return self._keyframe(frame, gray, detect), True
+
+            tracked = self._track(gray)
+            if tracked is None:
+                return self._keyframe(frame, gray, detect), True
+
+            self.tracked_frames += 1
+            return tracked, False
+
+    def _needs_keyframe(self, gray):
+        return (
+            not self.fret_boxes
+            or self.prev_gray is None
+            or self.prev_gray.shape != gray.shape
+            or self.points is None
+            or self.frames_since_keyframe >= self.keyframe_interval
+            or self.confidence < self.min_confidence
+        )
+
+    def _prepare(self, frame):
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+        if self.flow_scale != 1.0:
+            gray = cv2.resize(gray, None, fx=self.flow_scale, fy=self.flow_scale,
+                              interpolation=cv2.INTER_AREA)
+        return gray
+
+    def _keyframe(self, frame, gray, detect):
+        fret_boxes = detect(frame)
+        self.keyframes += 1
+        self.frames_since_keyframe = 0
+        self.fret_boxes = fret_boxes
+        self.prev_gray = gray
+        self.points = self._select_points(gray, fret_boxes) if fret_boxes else None
+        self.confidence = 1.0 if self.points is not None else 0.0
+        return fret_boxes
+
+    def _select_points(self, gray, fret_boxes):
+        """Pick trackable corners inside the merged fretboard box (flow scale)"""
+        boxes = np.array(list(fret_boxes.values()), dtype=np.float32) * self.flow_scale
+        h, w = gray.shape[:2]
+        x1 = int(max(0, np.min(boxes[:, 0])))
+        y1 = int(max(0, np.min(boxes[:, 1])))
+        x2 = int(min(w, np.max(boxes[:, 2]) + 1))
+        y2 = int(min(h, np.max(boxes[:, 3]) + 1))
+        if x2 <= x1 or y2 <= y1:
+            return None
+
+        mask = np.zeros_like(gray)
+        mask[y1:y2, x1:x2] = 255
+        points = cv2.goodFeaturesToTrack(gray, maxCorners=80, qualityLevel=0.01,
+                                         minDistance=5, mask=mask)
+        if points is None or len(points) < 6:
+            # Textureless fretboard - fall back to the box corners themselves
+            corners = np.concatenate([boxes[:, :2], boxes[:, 2:]], axis=0)
+            points = corners.reshape(-1, 1, 2)
+        return points.astype(np.float32)
+
+    def _track(self, gray):
+        try:
+            next_points, status, _ = cv2.calcOpticalFlowPyrLK(
+                self.prev_gray, gray, self.points, None, winSize=(15, 15), maxLevel=2
+            )
+        except cv2.error:
+            # Anything OpenCV can't track through is a lost track, not a failed frame
+            self.confidence = 0.0
+            return None
+        if next_points is None:
+            self.confidence = 0.0
+            return None
+
+        good = status.reshape(-1) == 1
+        if good.sum() < 4:
+            self.confidence = 0.0
+            return None
+
+        prev_good = self.points[good]
+        next_good = next_points[good]
+        try:
+            matrix, inliers = cv2.estimateAffinePartial2D(prev_good, next_good,
+                                                          method=cv2.RANSAC,
+                                                          ransacReprojThreshold=2.0)
+        except cv2.error:
+            matrix = None
+        if matrix is None:
+            self.confidence = 0.0
+            return None
 
-        if len(boxes) == 0:
+        inlier_mask = inliers.reshape(-1) == 1
+        self.confidence = float(inlier_mask.sum()) / len(self.points)
+        if self.confidence < self.min_confidence:
             return None
 
-        # Merge all boxes into one large fretboard box
-        x1 = int(np.min(boxes[:, 0]))
-        y1 = int(np.min(boxes[:, 1]))
-        x2 = int(np.max(boxes[:, 2]))
-        y2 = int(np.max(boxes[:, 3]))
+        # Points are in flow-scale coordinates; rescale the translation for full-frame boxes
+        full_matrix = matrix.copy()
+        full_matrix[:, 2] /= self.flow_scale
+        self.fret_boxes = self._transform_boxes(self.fret_boxes, full_matrix)
+        self.prev_gray = gray
+        self.points = next_good[inlier_mask].reshape(-1, 1, 2)
+        self.frames_since_keyframe += 1
+        return self.fret_boxes
 
-        return (x1, y1, x2, y2)
+    @staticmethod
+    def _transform_boxes(fret_boxes, matrix):
+        frets = list(fret_boxes.keys())
+        boxes = np.array([fret_boxes[f] for f in frets], dtype=np.float32)
+        corners = np.stack([
+            boxes[:, [0, 1]], boxes[:, [2, 1]], boxes[:, [0, 3]], boxes[:, [2, 3]]
+        ], axis=1)
+        moved = corners @ matrix[:, :2].T + matrix[:, 2]
+        new_boxes = np.concatenate([moved.min(axis=1), moved.max(axis=1)], axis=1)
+        return {f: box for f, box in zip(frets, new_boxes.round().astype(int))}
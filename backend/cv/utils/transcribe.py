@@ -0,0 +1,195 @@
+import argparse
+import json
+import logging
+import os
+import struct
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from utils.audio_chord_detector import CHORD_NAMES, chord_confidence, chord_timeline
+from utils.chroma import chroma_filterbank, frame_signal, power_spectrogram
+
+# Offline chord transcription of long recordings:
+#   python -m utils.transcribe song.wav --workers 8 --out song_chords.json
+# The WAV file is memory-mapped, never loaded whole. Chroma frames are split
+# into chunks computed in parallel; each chunk reads the n_fft - hop_length
+# samples it shares with its neighbours, so the stitched result is identical
+# to chroma_stft over the whole signal. The chroma is then decoded into a
+# smoothed, time-stamped chord sequence with chord_timeline.
+
+logger = logging.getLogger(__name__)
+
+N_FFT = 2048
+HOP_LENGTH = 512
+
+
+class WavInfo:
+    __slots__ = ("path", "sr", "channels", "sample_width", "data_offset", "n_samples", "float_data")
+
+    def __init__(self, path, sr, channels, sample_width, data_offset, n_samples, float_data):
+        self.path = path
+        self.sr = sr
+        self.channels = channels
+        self.sample_width = sample_width
+        self.data_offset = data_offset
+        self.n_samples = n_samples
+        self.float_data = float_data
+
+    @property
+    def duration(self):
+        return self.n_samples / self.sr
+
+
+def read_wav_info(path):
+    """Walk the RIFF chunks for the format and the byte range of the sample data"""
+    with open(path, "rb") as f:
+        riff, _, kind = struct.unpack("<4sI4s", f.read(12))
+        if riff != b"RIFF" or kind != b"WAVE":
+            raise ValueError(f"{path} is not a RIFF/WAVE file")
+        fmt = None
+        while True:
+            header = f.read(8)
+            if len(header) < 8:
+                raise ValueError(f"{path} has no data chunk")
+            chunk_id, size = struct.unpack("<4sI", header)
+            if chunk_id == b"fmt ":
+                fmt = struct.unpack("<HHIIHH", f.read(16))
+                f.seek(size - 16 + (size & 1), os.SEEK_CUR)
+            elif chunk_id == b"data":
+                if fmt is None:
+                    raise ValueError(f"{path}: data chunk before fmt chunk")
+                data_offset = f.tell()
+                # Streams written without knowing their length leave size at 0 or 0xFFFFFFFF
+                file_size = os.fstat(f.fileno()).st_size
+                data_size = min(size, file_size - data_offset) if size else file_size - data_offset
+                break
+            else:
+                f.seek(size + (size & 1), os.SEEK_CUR)
+
+    audio_format, channels, sr, _, _, bits = fmt
+    sample_width = bits // 8
+    float_data = audio_format == 3
+    if audio_format not in (1, 3, 0xFFFE):
+        raise ValueError(f"{path}: unsupported WAV encoding {audio_format}")
+    if float_data and sample_width != 4:
+        raise ValueError(f"{path}: unsupported float width {sample_width}")
+    if sample_width not in (1, 2, 3, 4):
+        raise ValueError(f"{path}: unsupported sample width {sample_width}")
+    n_samples = data_size // (sample_width * channels)
+    return WavInfo(path, sr, channels, sample_width, data_offset, n_samples, float_data)
+
+
+def read_samples(info, start, stop):
+    """Mono float32 samples [start, stop) from a memory map, zero-padded outside the file"""
+    lo, hi = max(start, 0), min(stop, info.n_samples)
+    out = np.zeros(stop - start, dtype=np.float32)
+    if hi <= lo:
+        return out
+
+    width, channels = info.sample_width, info.channels
+    raw = np.memmap(info.path, dtype=np.uint8, mode="r",
+                    offset=info.data_offset + lo * width * channels,
+                    shape=((hi - lo) * width * channels,))
+    if info.float_data:
+        samples = raw.view("<f4").astype(np.float32)
+    elif width == 1:
+        samples = (raw.astype(np.float32) - 128.0) / 128.0
+    elif width == 2:
+        samples = raw.view("<i2").astype(np.float32) / 32768.0
+    elif width == 3:
+        b = raw.reshape(-1, 3).astype(np.int32)
+        ints = b[:, 0] | (b[:, 1] << 8) | (b[:, 2] << 16)
+        ints = np.where(ints & 0x800000, ints - 0x1000000, ints)
+        samples = ints.astype(np.float32) / 8388608.0
+    else:
+        samples = raw.view("<i4").astype(np.float32) / 2147483648.0
+    del raw
+
+    if channels > 1:
+        samples = samples.reshape(-1, channels).mean(axis=1)
+    out[lo - start:hi - start] = samples
+    return out
+
+
+def frame_count(n_samples, hop_length=HOP_LENGTH):
+    """Frames chroma_stft produces for a centered signal of n_samples"""
+    return 1 + n_samples // hop_length
+
+
+def chunk_chroma(path, first_frame, stop_frame, n_fft=N_FFT, hop_length=HOP_LENGTH):
+    """Unnormalized (12, stop - first) chroma for one chunk of frames"""
+    info = read_wav_info(path)
+    # Frame t is centered on sample t * hop, covering [t * hop - n_fft / 2, t * hop + n_fft / 2)
+    start = first_frame * hop_length - n_fft // 2
+    stop = (stop_frame - 1) * hop_length + n_fft // 2
+    frames = frame_signal(read_samples(info, start, stop), n_fft, hop_length, center=False)
+    return chroma_filterbank(info.sr, n_fft) @ power_spectrogram(frames, n_fft)
+
+
+def file_chroma(path, workers=None, chunk_seconds=30.0, n_fft=N_FFT, hop_length=HOP_LENGTH):
+    """(12, n_frames) chroma for a whole WAV file, matching chroma_stft(y, sr)"""
+    info = read_wav_info(path)
+    n_frames = frame_count(info.n_samples, hop_length)
+    chunk_frames = max(1, int(chunk_seconds * info.sr / hop_length))
+    chunks = [(s, min(s + chunk_frames, n_frames)) for s in range(0, n_frames, chunk_frames)]
+
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(chunks) == 1:
+        parts = [chunk_chroma(path, s, e, n_fft, hop_length) for s, e in chunks]
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(chunks))) as pool:
+            parts = list(pool.map(chunk_chroma, *zip(*[(path, s, e, n_fft, hop_length) for s, e in chunks])))
+
+    chroma = np.concatenate(parts, axis=1) if parts else np.zeros((12, 0), dtype=np.float32)
+    peaks = chroma.max(axis=0)
+    return chroma / np.where(peaks > np.finfo(np.float32).tiny, peaks, 1.0), info
+
+
+def transcribe(path, workers=None, chunk_seconds=30.0, hop_length=HOP_LENGTH, **smoothing):
+    """Time-stamped chord segments for a WAV file.
+
+    Returns [{"chord", "start", "end", "confidence"}], where confidence is
+    the template similarity of the segment's mean chroma.
+    """
+    chroma, info = file_chroma(path, workers, chunk_seconds, hop_length=hop_length)
+    segments = chord_timeline(chroma, info.sr, hop_length, **smoothing)
+    for segment in segments:
+        first = int(round(segment["start"] * info.sr / hop_length))
+        last = int(round(segment["end"] * info.sr / hop_length))
+        if segment["chord"] in CHORD_NAMES:
+            segment["confidence"] = round(chord_confidence(chroma[:, first:last].mean(axis=1), segment["chord"]), 3)
+        else:
+            segment["confidence"] = 0.0
+        segment["start"] = round(segment["start"], 3)
+        segment["end"] = round(min(segment["end"], info.duration), 3)
+    return segments, info
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Transcribe the chords of a WAV recording")
+    parser.add_argument("audio", help="PCM or float WAV file")
+    parser.add_argument("--workers", type=int, default=None, help="processes for chroma (default: all cores)")
+    parser.add_argument("--chunk-seconds", type=float, default=30.0)
+    parser.add_argument("--self-transition", type=float, default=0.9,
+                        help="HMM probability of staying on a chord; higher = fewer, longer segments")
+    parser.add_argument("--keep-unknown", action="store_true", help="include Unknown segments")
+    parser.add_argument("--out", help="write the timeline JSON here instead of stdout")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=os.environ.get("CV_LOG_LEVEL", "INFO").upper(),
+                        format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    started = time.perf_counter()
+    segments, info = transcribe(args.audio, args.workers, args.chunk_seconds,
+                                self_transition=args.self_transition)
+    elapsed = time.perf_counter() - started
+    if not args.keep_unknown:
+        segments = [s for s in segments if s["chord"] != "Unknown"]
+    logger.info("🎼 %.1fs of audio in %.2fs (%.0fx real time), %d segments",
+                info.duration, elapsed, info.duration / elapsed if elapsed else 0.0, len(segments))
+
+    result = {"audio": args.audio, "duration": info.duration, "sr": info.sr, "segments": segments}
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(result, f, indent=2)
+    else:
+        print(json.dumps(result, indent=2))
@@ -0,0 +1,335 @@
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import cv2
+import numpy as np
+from utils.chord_geometry import MAX_FRET, ChordTable
+from utils.inference import DEFAULT_BACKEND, DEFAULT_IMGSZ
+
+# Offline analysis of recorded practice videos:
+#   python -m utils.video_batch practice.mp4 --out practice_analysis --workers 8
+# The video is split into fixed-size frame chunks. Each worker process seeks to
+# its chunk, runs batched detection, and writes one .npz shard, so an
+# interrupted run resumes from the shards already on disk. <out>/manifest.json
+# records the settings the shards were made with; a re-run with different
+# settings starts over, and shards whose frames or arrays don't match their
+# chunk are redone. Shards are merged into <out>/frames.npz at the end.
+# Arrays in the merged file:
+#   frame_index (N,)         int32   frame number in the video
+#   timestamp   (N,)         float32 seconds, from the container fps
+#   fret_boxes  (N, 13, 4)   int32   [x1, y1, x2, y2] indexed by fret (row 0 unused)
+#   fret_mask   (N, 13)      bool    which frets were detected
+#   overlay_<chord> (N, P, 2) int32  dot x/y for each of the chord's P positions, -1 if its fret is missing
+
+logger = logging.getLogger(__name__)
+
+LABEL_TO_FRET = {f"Zone{i}": i for i in range(1, MAX_FRET + 1)}
+MIN_CONFIDENCE = 0.5
+BASE_ARRAYS = ("frame_index", "timestamp", "fret_boxes", "fret_mask")
+
+# Set per worker process; one model and one thread budget per core
+_detector = None
+_chord_table = None
+
+
+def video_info(path):
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened():
+        raise IOError(f"Could not open video {path!r}")
+    try:
+        return {
+            "frame_count": int(cap.get(cv2.CAP_PROP_FRAME_COUNT)),
+            "fps": cap.get(cv2.CAP_PROP_FPS) or 30.0,
+            "width": int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+            "height": int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+        }
+    finally:
+        cap.release()
+
+
+def plan_chunks(start, end, chunk_frames):
+    """[(first_frame, stop_frame), ...] covering start..end"""
+    return [(s, min(s + chunk_frames, end)) for s in range(start, end, chunk_frames)]
+
+
+def shard_path(out_dir, start):
+    return os.path.join(out_dir, "shards", f"chunk_{start:09d}.npz")
+
+
+def manifest_path(out_dir):
+    return os.path.join(out_dir, "manifest.json")
+
+
+def shard_keys(chords):
+    return set(BASE_ARRAYS) | {f"overlay_{name}" for name in chords}
+
+
+def shard_problem(out_dir, start, stop, chords):
+    """Why the shard for frames start..stop-1 can't be used, or None if it can.
+
+    A shard may hold fewer frames than planned when the video ends early,
+    but its frames must be consecutive from `start`.
+    """
+    path = shard_path(out_dir, start)
+    if not os.path.exists(path):
+        return "missing"
+    try:
+        with np.load(path) as shard:
+            missing = shard_keys(chords) - set(shard.files)
+            if missing:
+                return f"missing arrays {sorted(missing)}"
+            frame_index = shard["frame_index"]
+    except (OSError, ValueError) as e:
+        return f"unreadable ({e})"
+    if len(frame_index) > stop - start or \
+            not np.array_equal(frame_index, np.arange(start, start + len(frame_index))):
+        return f"frames don't match chunk {start}..{stop - 1}"
+    return None
+
+
+def check_manifest(out_dir, manifest):
+    """Write the run's manifest; shards from a run with other settings are discarded"""
+    path = manifest_path(out_dir)
+    shards = os.path.join(out_dir, "shards")
+    if os.path.exists(path):
+        with open(path) as f:
+            previous = json.load(f)
+        if previous != manifest:
+            changed = sorted(k for k in set(previous) | set(manifest) if previous.get(k) != manifest.get(k))
+            logger.warning("⚠️ %s was written with different settings (%s); discarding its shards",
+                           out_dir, ", ".join(changed))
+            shutil.rmtree(shards, ignore_errors=True)
+    elif os.path.isdir(shards) and os.listdir(shards):
+        logger.warning("⚠️ %s has shards but no manifest; discarding them", out_dir)
+        shutil.rmtree(shards, ignore_errors=True)
+    os.makedirs(shards, exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(manifest, f, indent=2)
+
+
+def _init_worker(threads, backend, model_path, imgsz, chords_path):
+    """Pin each worker to `threads` math threads before the model loads"""
+    global _detector, _chord_table
+    for var in ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS"):
+        os.environ[var] = str(threads)
+    cv2.setNumThreads(threads)
+    try:
+        import torch
+        torch.set_num_threads(threads)
+    except ImportError:
+        pass
+
+    # Imported here so the thread limits above apply to the model runtime
+    from utils.inference import load_detector
+    _detector = load_detector(backend=backend, path=model_path, imgsz=imgsz)
+    _chord_table = ChordTable.from_json(chords_path)
+
+
+def _open_at(path, start):
+    """Capture positioned at frame `start`, decoding forward if seeking is inexact"""
+    cap = cv2.VideoCapture(path)
+    if start and cap.set(cv2.CAP_PROP_POS_FRAMES, start) and int(cap.get(cv2.CAP_PROP_POS_FRAMES)) == start:
+        return cap
+    cap.release()
+    cap = cv2.VideoCapture(path)
+    for _ in range(start):
+        if not cap.grab():
+            break
+    return cap
+
+
+def _fret_arrays(detections):
+    boxes = np.zeros((MAX_FRET + 1, 4), dtype=np.int32)
+    mask = np.zeros(MAX_FRET + 1, dtype=bool)
+    for label, conf, bbox in detections:
+        fret = LABEL_TO_FRET.get(label)
+        if fret is not None and conf > MIN_CONFIDENCE:
+            boxes[fret] = bbox.astype(int)
+            mask[fret] = True
+    return boxes, mask
+
+
+def _overlay_columns(table, chords, boxes, masks):
+    """overlay_<chord> arrays of dot positions, -1 where a fret wasn't detected"""
+    columns = {}
+    for name in chords:
+        positions = table.positions(name)
+        points = np.full((len(boxes), len(positions), 2), -1, dtype=np.int32)
+        slot = {pos: i for i, pos in enumerate(positions)}
+        for n, (frame_boxes, frame_mask) in enumerate(zip(boxes, masks)):
+            fret_boxes = {f: frame_boxes[f] for f in np.flatnonzero(frame_mask).tolist()}
+            frets, strings, xs, ys = table.overlay_points(name, fret_boxes)
+            for fret, string, x, y in zip(frets.tolist(), strings.tolist(), xs.tolist(), ys.tolist()):
+                points[n, slot[(fret, string)]] = (x, y)
+        columns[f"overlay_{name}"] = points
+    return columns
+
+
+def process_chunk(path, start, stop, fps, out_dir, batch_size, chords):
+    """Detect fret boxes for frames start..stop-1 and write the chunk's shard"""
+    started = time.perf_counter()
+    cap = _open_at(path, start)
+    indices, boxes, masks = [], [], []
+    batch, batch_indices = [], []
+
+    def flush():
+        for index, detections in zip(batch_indices, _detector.detect(batch)):
+            frame_boxes, frame_mask = _fret_arrays(detections)
+            indices.append(index)
+            boxes.append(frame_boxes)
+            masks.append(frame_mask)
+        batch.clear()
+        batch_indices.clear()
+
+    try:
+        for index in range(start, stop):
+            ok, frame = cap.read()
+            if not ok:
+                break
+            batch.append(frame)
+            batch_indices.append(index)
+            if len(batch) >= batch_size:
+                flush()
+        if batch:
+            flush()
+    finally:
+        cap.release()
+
+    boxes = np.array(boxes, dtype=np.int32).reshape(-1, MAX_FRET + 1, 4)
+    masks = np.array(masks, dtype=bool).reshape(-1, MAX_FRET + 1)
+    frame_index = np.array(indices, dtype=np.int32)
+    arrays = {
+        "frame_index": frame_index,
+        "timestamp": (frame_index / fps).astype(np.float32),
+        "fret_boxes": boxes,
+        "fret_mask": masks,
+    }
+    arrays.update(_overlay_columns(_chord_table, chords, boxes, masks))
+
+    # Write then rename, so a killed worker never leaves a half-written shard behind
+    target = shard_path(out_dir, start)
+    tmp = target + ".tmp.npz"
+    np.savez_compressed(tmp, **arrays)
+    os.replace(tmp, target)
+    return start, len(indices), time.perf_counter() - started
+
+
+def merge_shards(out_dir, chunks, chords):
+    """Concatenate chunk shards in frame order into <out_dir>/frames.npz"""
+    keys = shard_keys(chords)
+    parts = {}
+    for start, stop in chunks:
+        problem = shard_problem(out_dir, start, stop, chords)
+        if problem is not None:
+            raise ValueError(f"Shard for chunk {start}..{stop - 1} is {problem}")
+        with np.load(shard_path(out_dir, start)) as shard:
+            for key in keys:
+                parts.setdefault(key, []).append(shard[key])
+    merged = {key: np.concatenate(values) for key, values in parts.items()}
+    target = os.path.join(out_dir, "frames.npz")
+    np.savez_compressed(target, **merged)
+    return target, len(merged.get("frame_index", ()))
+
+
+def analyze_video(path, out_dir, workers=None, chunk_frames=300, batch_size=8, threads_per_worker=1,
+                  start_frame=0, end_frame=None, chords=None, backend=None, model_path=None, imgsz=None,
+                  chords_path="assets/data/chords.json", keep_shards=True):
+    """Run detection over a whole video on a process pool; returns the run summary"""
+    info = video_info(path)
+    end = info["frame_count"] if end_frame is None else min(end_frame, info["frame_count"])
+    chunks = plan_chunks(start_frame, end, chunk_frames)
+    table = ChordTable.from_json(chords_path)
+    chords = list(chords or table.names)
+    unknown = [c for c in chords if c not in table]
+    if unknown:
+        raise ValueError(f"Unknown chords: {unknown}")
+
+    check_manifest(out_dir, {
+        "video": os.path.abspath(path),
+        "frame_count": info["frame_count"],
+        "start_frame": start_frame,
+        "end_frame": end,
+        "chunk_frames": chunk_frames,
+        "chords": chords,
+        "backend": backend or os.environ.get("CV_MODEL_BACKEND", DEFAULT_BACKEND),
+        "model_path": model_path or os.environ.get("CV_MODEL_PATH"),
+        "imgsz": int(imgsz or os.environ.get("CV_IMGSZ", DEFAULT_IMGSZ)),
+    })
+    pending = []
+    for start, stop in chunks:
+        problem = shard_problem(out_dir, start, stop, chords)
+        if problem is not None:
+            if problem != "missing":
+                logger.warning("⚠️ Redoing chunk @%d: shard is %s", start, problem)
+            pending.append((start, stop))
+    logger.info("🎞️ %s: %d frames @ %.1f fps, %d chunks (%d already done)",
+                path, end - start_frame, info["fps"], len(chunks), len(chunks) - len(pending))
+
+    workers = workers or os.cpu_count() or 1
+    started = time.perf_counter()
+    frames_done = 0
+    if pending:
+        # spawn, not fork: each worker gets a clean runtime with its own thread limits
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=min(workers, len(pending)), mp_context=context,
+                                 initializer=_init_worker,
+                                 initargs=(threads_per_worker, backend, model_path, imgsz, chords_path)) as pool:
+            futures = [pool.submit(process_chunk, path, s, e, info["fps"], out_dir, batch_size, chords)
+                       for s, e in pending]
+            for future in as_completed(futures):
+                start, count, seconds = future.result()
+                frames_done += count
+                logger.info("✅ Chunk @%d: %d frames in %.1fs (%.1f fps)",
+                            start, count, seconds, count / seconds if seconds else 0.0)
+
+    elapsed = time.perf_counter() - started
+    target, total = merge_shards(out_dir, chunks, chords)
+    summary = {
+        "video": path,
+        "output": target,
+        "frames": total,
+        "fps": info["fps"],
+        "chunks": len(chunks),
+        "chunk_frames": chunk_frames,
+        "workers": workers,
+        "chords": chords,
+        "processed_frames": frames_done,
+        "processing_seconds": elapsed,
+        "throughput_fps": frames_done / elapsed if elapsed and frames_done else 0.0,
+    }
+    with open(os.path.join(out_dir, "summary.json"), "w") as f:
+        json.dump(summary, f, indent=2)
+
+    if not keep_shards:
+        for start, _ in chunks:
+            os.remove(shard_path(out_dir, start))
+    return summary
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Detect fret boxes across a recorded practice video")
+    parser.add_argument("video")
+    parser.add_argument("--out", required=True, help="output directory (re-run with the same one to resume)")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--threads-per-worker", type=int, default=1)
+    parser.add_argument("--chunk-frames", type=int, default=300)
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--start-frame", type=int, default=0)
+    parser.add_argument("--end-frame", type=int, default=None)
+    parser.add_argument("--chord", action="append", dest="chords", help="chord overlays to store (default: all)")
+    parser.add_argument("--backend", default=None, help="model backend (default: CV_MODEL_BACKEND)")
+    parser.add_argument("--drop-shards", action="store_true", help="delete chunk shards after merging")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=os.environ.get("CV_LOG_LEVEL", "INFO").upper(),
+                        format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    result = analyze_video(args.video, args.out, workers=args.workers, chunk_frames=args.chunk_frames,
+                           batch_size=args.batch_size, threads_per_worker=args.threads_per_worker,
+                           start_frame=args.start_frame, end_frame=args.end_frame, chords=args.chords,
+                           backend=args.backend, keep_shards=not args.drop_shards)
+    print(json.dumps(result, indent=2))